@@ -1,18 +1,17 @@
 import csv
 import logging
-from smtplib import SMTPDataError
 
 from django.contrib import admin
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.contrib.auth.validators import ASCIIUsernameValidator
-from django.core.mail import send_mail
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from accounts.managers import CustomUserManager
+from notifications.services import enqueue_email
 from utils.validators import validate_phone
 
 logger = logging.getLogger(__name__)
@@ -64,9 +63,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         """Return the short name for the user."""
         return self.first_name
 
-    def email_user(self, subject, message, from_email=None, **kwargs):
-        """Send an email to this user."""
-        send_mail(subject, message, from_email, [self.email], **kwargs)
+    def email_user(self, subject, message, from_email=None):
+        """Queue an email to this user, it is sent by the send_emails command."""
+        enqueue_email(self.email, subject, body=message, from_email=from_email)
 
     def get_absolute_url(self):
         return reverse('accounts:account', kwargs={'pk': self.pk})
@@ -128,11 +127,8 @@ class Profile(models.Model):
         try:
             old_currency = Profile.objects.get(pk=self.pk).currency
             if old_currency != self.currency:
-                try:
-                    self.user.email_user(subject='Change values',
-                                         message=f'Currency = {self.currency}')
-                except SMTPDataError:
-                    logger.error('Сообщение не было отправлено', exc_info=True)
+                self.user.email_user(subject='Change values',
+                                     message=f'Currency = {self.currency}')
         except Profile.DoesNotExist:
             pass
         super(Profile, self).save()
@@ -34,6 +34,7 @@ class GetProfileSerializer(serializers.ModelSerializer):
             'age',
             'user',
         ]
+        depends_on = {'age': ['birthday']}
 
 
 class PostProfileSerializer(serializers.ModelSerializer):
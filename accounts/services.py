@@ -1,11 +1,11 @@
 import logging
 
 from django.contrib.sites.shortcuts import get_current_site
-from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
 from accounts.tokens import account_activation_token
+from notifications.services import enqueue_email
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +13,10 @@ logger = logging.getLogger(__name__)
 def send_activation_email(request, user):
     current_site = get_current_site(request)
     subject = f'Activate Your {current_site} Account'
-    message = render_to_string('accounts/account_activation_email.html', {
+    enqueue_email(user.email, subject, template_name='accounts/account_activation_email.html', context={
         'user': user,
         'domain': current_site.domain,
         'uid': urlsafe_base64_encode(force_bytes(user.pk)),
         'token': account_activation_token.make_token(user),
     })
-    user.email_user(subject, message)
-    logger.info(f'Sent activation email to {user.email}')
\ No newline at end of file
+    logger.info(f'Queued activation email to {user.email}')
\ No newline at end of file
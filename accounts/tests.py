@@ -154,6 +154,23 @@ class TestCustomUser(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
 
+    def test_get_user_list_constant_queries(self):
+        self.user.is_staff = True
+        self.user.save()
+        for i in range(5):
+            user = CustomUser.objects.create_user(email=f'user{i}@bar.com', password='Qw789456')
+            region = Region.objects.create(region=f'Region {i}')
+            Profile.objects.update_or_create(user=user, defaults={'region': region})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+        # request user + users with profiles and regions
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('accounts:user-list'))
+
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(response.data[-1]['profile']['region']['region'], 'Region 4')
+
     def test_get_user_list_without_perm(self):
         """Access denied without is_staff permission"""
         CustomUser.objects.create_user(email='evil@bar.com', password='Qw789456')
@@ -24,11 +24,12 @@ from accounts.serializers import (ChangePasswordSerializer,
                                   PostCustomUserSerializer,
                                   PostProfileSerializer)
 from accounts.tokens import account_activation_token
+from utils.queryset import OptimizeQuerysetMixin
 
 logger = logging.getLogger(__name__)
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(OptimizeQuerysetMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = PostCustomUserSerializer
     permission_classes = [UserPermission]
@@ -72,7 +73,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         return Response(data={"Logout": "OK"}, status=status.HTTP_205_RESET_CONTENT)
 
 
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(OptimizeQuerysetMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = PostProfileSerializer
     permission_classes = [UserPermission]
@@ -114,7 +115,7 @@ class SendEmailView(SuccessMessageMixin, PermissionRequiredMixin, FormView):
         form = self.get_form()
         if form.is_valid():
             obj.email_user(subject=form.cleaned_data['subject'], message=form.cleaned_data['body'])
-            logger.info(f'Email sent {request.user.email}')
+            logger.info(f'Email queued {request.user.email}')
             return self.form_valid(form)
         return self.form_invalid(form)
 
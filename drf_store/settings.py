@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     "debug_toolbar",
     "corsheaders",
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'accounts.apps.AccountsConfig',
     'items.apps.ItemsConfig',
     'services.apps.ServicesConfig',
+    'notifications.apps.NotificationsConfig',
 ]
 
 MIDDLEWARE = [
@@ -112,6 +114,17 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -182,6 +195,11 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = os.getenv('EMAIL_PORT')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
 
+# Emails are queued in notifications.OutgoingEmail and sent by the send_emails command:
+# attempts before an email is marked failed and delay (seconds) before the first retry, doubled after each one
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', default=60))
+
 
 DATE_FORMAT = 'j N, Y'
 
@@ -236,18 +254,35 @@ LOGGING = {
             'level': 'DEBUG',
             'handlers': ['console', 'file', 'mail_admins'],
         },
+        'notifications': {
+            'level': 'DEBUG',
+            'handlers': ['console', 'file'],
+        },
     }
 }
 
 # List categories for adult
 ADULT_CATEGORIES = [cat.strip() for cat in os.getenv('ADULT_CATEGORIES', default='18+').split(',')]
 
+# Text search configurations for catalog full text search
+SEARCH_CONFIGS = [config.strip() for config in os.getenv('SEARCH_CONFIGS', default='russian,english').split(',')]
+
+# Cache alias and timeout (seconds) for catalog responses
+CATALOG_CACHE_ALIAS = os.getenv('CATALOG_CACHE_ALIAS', default='default')
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', default=600))
+
 # Max user's discount for items
 MAX_DISCOUNT = float(os.getenv('MAX_DISCOUNT', default=0.3))
 
 # Percent of price for rent of item per day
 PERCENT_OF_PRICE = float(os.getenv('PERCENT_OF_PRICE', default=0.1))
 
+# Minutes an item stays reserved in unpaid cart before release_reservations returns it to stock
+CART_RESERVATION_TTL = int(os.getenv('CART_RESERVATION_TTL', default=30))
+
+# Hours a response to a request with Idempotency-Key header is stored and replayed
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', default=24))
+
 # Prefix for api URL
 API_PREFIX_URL = os.getenv('API_PREFIX_URL')
 
@@ -259,6 +294,15 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'utils.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
 
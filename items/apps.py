@@ -6,3 +6,7 @@ class ItemsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'items'
     verbose_name = _('Items')
+
+    def ready(self):
+        # Implicitly connect a signal handlers decorated with @receiver.
+        from . import signals
@@ -0,0 +1,134 @@
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from psycopg2.extras import execute_values
+
+from items.cache import bump_generation
+from items.models import Item
+from items.signals import items_repriced
+from utils.utils import transliterate_string
+
+
+def insert_values(model, fields, values) -> None:
+    """
+    Вставка строк одним INSERT ... VALUES без создания экземпляров моделей
+    :param fields: имена полей модели в порядке значений
+    :param values: кортежи значений
+    """
+    if not values:
+        return
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(model._meta.get_field(field).column) for field in fields)
+    sql = f'INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES %s'
+    with connection.cursor() as cursor:
+        execute_values(cursor.cursor, sql, values, page_size=len(values))
+
+
+def pop_many_to_many(model, validated_data: list[dict]) -> list[dict]:
+    """
+    Извлечение значений полей ManyToMany из данных товаров
+    :return: {имя поля: связанные объекты} для каждого товара
+    """
+    names = [field.name for field in model._meta.many_to_many]
+    return [{name: data.pop(name) for name in names if name in data} for data in validated_data]
+
+
+def set_prefetched(obj, name: str, related) -> None:
+    """Заполнение кэша prefetch_related, чтобы сериализатор не запрашивал связи повторно"""
+    queryset = getattr(obj, name).all()
+    queryset._result_cache = list(related)
+    queryset._prefetch_done = True
+    if not hasattr(obj, '_prefetched_objects_cache'):
+        obj._prefetched_objects_cache = {}
+    obj._prefetched_objects_cache[name] = queryset
+
+
+def write_many_to_many(model, objs, related: list[dict], replace: bool = False) -> None:
+    """
+    Запись связей ManyToMany одним INSERT на промежуточную таблицу
+    :param related: {имя поля: связанные объекты} для каждого товара
+    :param replace: удалить существующие связи переданных полей
+    """
+    for field in model._meta.many_to_many:
+        owners = [(obj, values[field.name]) for obj, values in zip(objs, related) if field.name in values]
+        if not owners:
+            continue
+        through = field.remote_field.through
+        owner_column = f'{field.m2m_field_name()}_id'
+        target_column = f'{field.m2m_reverse_field_name()}_id'
+        if replace:
+            through.objects.filter(**{f'{owner_column}__in': [obj.pk for obj, _ in owners]}).delete()
+        through.objects.bulk_create([
+            through(**{owner_column: obj.pk, target_column: target.pk})
+            for obj, targets in owners for target in dict.fromkeys(targets)
+        ])
+
+
+def refresh_items(model, objs) -> None:
+    """Пересчет флага is_adult и поискового вектора, сброс кэша ответов"""
+    pks = [obj.pk for obj in objs]
+    Item.objects.update_adult_flag(pks)
+    Item.objects.update_search_vector(pks)
+    adult = set(Item.objects.filter(pk__in=pks, is_adult=True).values_list('pk', flat=True))
+    for obj in objs:
+        obj.is_adult = obj.pk in adult
+    bump_generation(model)
+
+
+@transaction.atomic
+def bulk_create_items(model, validated_data: list[dict]) -> list:
+    """
+    Создание товаров дочерней модели пачкой.
+    Строки Item вставляются одним bulk_create, строки дочерней модели и связи ManyToMany -
+    одним INSERT на таблицу, флаг is_adult и поисковый вектор пересчитываются одним UPDATE.
+    :param model: дочерняя модель товара (Book, Magazine, Figure)
+    :param validated_data: проверенные данные сериализатора
+    """
+    related = pop_many_to_many(model, validated_data)
+    objs = [model(**data) for data in validated_data]
+    for obj in objs:
+        obj.item_type = model._meta.model_name
+        obj.title_translit = transliterate_string(obj.title.lower())
+
+    Item.objects.bulk_create(objs)
+    # bulk_create не поддерживает наследование моделей, поэтому дочерние строки вставляются отдельно
+    fields = model._meta.local_concrete_fields
+    for obj in objs:
+        setattr(obj, model._meta.pk.attname, obj.id)
+    insert_values(model, [field.name for field in fields], [
+        tuple(field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields)
+        for obj in objs
+    ])
+    write_many_to_many(model, objs, related)
+
+    for obj, values in zip(objs, related):
+        for field in model._meta.many_to_many:
+            set_prefetched(obj, field.name, dict.fromkeys(values.get(field.name, [])))
+    refresh_items(model, objs)
+    return objs
+
+
+@transaction.atomic
+def bulk_update_items(model, instances: list, validated_data: list[dict]) -> list:
+    """
+    Изменение товаров дочерней модели пачкой: один bulk_update на таблицу модели и ее родителя,
+    переданные связи ManyToMany заменяются одним DELETE и одним INSERT на промежуточную таблицу.
+    :param instances: изменяемые товары в порядке validated_data
+    """
+    related = pop_many_to_many(model, validated_data)
+    fields = {'title_translit'}
+    for obj, data in zip(instances, validated_data):
+        for name, value in data.items():
+            setattr(obj, name, value)
+        fields.update(data)
+        obj.title_translit = transliterate_string(obj.title.lower())
+
+    model.objects.bulk_update(instances, sorted(fields))
+    write_many_to_many(model, instances, related, replace=True)
+    if 'price' in fields:
+        items_repriced.send(sender=model, pks=[obj.pk for obj in instances])
+
+    for obj in instances:
+        obj._prefetched_objects_cache = {}
+    prefetch_related_objects(instances, *(field.name for field in model._meta.many_to_many))
+    refresh_items(model, instances)
+    return instances
@@ -0,0 +1,179 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from items.managers import ControlAdultMixin
+
+
+def get_catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_generation_key(model) -> str:
+    return f'catalog:generation:{model._meta.label_lower}'
+
+
+def get_modified_key(model) -> str:
+    return f'catalog:modified:{model._meta.label_lower}'
+
+
+def get_generations(models) -> list[int]:
+    """
+    Текущие номера поколений моделей.
+    Отсутствующий в кэше номер инициализируется текущим временем, чтобы после
+    вытеснения ключа не вернуться к номеру, для которого еще хранятся ответы.
+    """
+    cache = get_catalog_cache()
+    keys = [get_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def get_modification_times(models) -> list[float]:
+    """
+    Время последнего увеличения номеров поколений моделей.
+    Отсутствующее в кэше время, как и номер поколения, инициализируется текущим временем.
+    """
+    cache = get_catalog_cache()
+    keys = [get_modified_key(model) for model in models]
+    times = cache.get_many(keys)
+    for key in keys:
+        if key not in times:
+            cache.add(key, time.time(), timeout=None)
+            times[key] = cache.get(key)
+    return [times[key] for key in keys]
+
+
+def _increment_generations(models) -> None:
+    cache = get_catalog_cache()
+    for model in models:
+        key = get_generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+    cache.set_many({get_modified_key(model): time.time() for model in models}, timeout=None)
+
+
+def bump_generation(*models) -> None:
+    """
+    Увеличение номеров поколений моделей: закэшированные ответы, зависящие от них, устаревают.
+    Повторяем после коммита транзакции, чтобы не оставить в кэше данные,
+    прочитанные параллельным запросом до коммита.
+    """
+    models = {parent for model in models for parent in [model, *model._meta.get_parent_list()]}
+    _increment_generations(models)
+    transaction.on_commit(lambda: _increment_generations(models))
+
+
+def get_user_class(user) -> str:
+    """Класс пользователя, от которого зависит содержимое каталога"""
+    role = 'staff' if user.is_staff else 'user'
+    age = 'adult' if ControlAdultMixin.user_is_adult(user) else 'minor'
+    return f'{role}-{age}'
+
+
+def get_request_signature(view, request) -> str:
+    """Строка, однозначно определяющая запрос view с точностью до класса пользователя"""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return '|'.join([
+        f'{view.__class__.__module__}.{view.__class__.__name__}',
+        view.action,
+        request.path,
+        query,
+        get_user_class(request.user),
+    ])
+
+
+class CachedResponseMixin:
+    """
+    Кэширование ответов list/retrieve.
+    Ключ состоит из view, нормализованной строки запроса, класса пользователя
+    и номеров поколений моделей cache_models, поэтому инвалидация выполняется
+    увеличением номера поколения (bump_generation) за O(1).
+    """
+    cache_models = []
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        cache = get_catalog_cache()
+        key = self.get_response_cache_key(request)
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    def get_response_cache_key(self, request) -> str:
+        generations = get_generations(self.cache_models)
+        signature = '|'.join([
+            get_request_signature(self, request),
+            ','.join(str(generation) for generation in generations),
+        ])
+        return f'catalog:response:{hashlib.md5(signature.encode()).hexdigest()}'
+
+
+class ConditionalResponseMixin:
+    """
+    Условные GET-запросы list/retrieve (ETag, Last-Modified).
+    ETag вычисляется из запроса и номеров поколений cache_models, Last-Modified - из времени
+    их последнего увеличения: оба читаются из кэша без запросов к базе, поэтому при совпадении
+    If-None-Match/If-Modified-Since ответ 304 возвращается до выборки и сериализации данных.
+    """
+    cache_models = []
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+        # Содержимое зависит от класса пользователя (возрастные ограничения), а Last-Modified - нет:
+        # без Cookie кэш клиента с сессионной авторизацией получил бы 304 после смены пользователя
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+    def get_validators(self, request) -> tuple[str, int | None]:
+        """
+        Валидаторы ответа
+        :return: (ETag, время последнего изменения в секундах или None)
+        """
+        generations = get_generations(self.cache_models)
+        signature = '|'.join([
+            get_request_signature(self, request),
+            ','.join(str(generation) for generation in generations),
+        ])
+        modified = get_modification_times(self.cache_models)
+        last_modified = int(max(modified)) if modified else None
+        return f'"{hashlib.md5(signature.encode()).hexdigest()}"', last_modified
@@ -0,0 +1,113 @@
+from itertools import islice
+
+from items.models import Author, Brand, Genre, Item, Language, Publisher
+
+# Общие колонки выгрузки товаров
+ITEM_EXPORT_COLUMNS = ['id', 'type', 'title', 'slug', 'price', 'count_available', 'categories']
+
+# Тип товара -> (колонки модели, {колонка: (поле ForeignKey, модель)}, {колонка: (поле ManyToMany, модель)})
+MAP_TYPE_TO_EXPORT = {
+    Item.ItemTypes.BOOK: (
+        ['year'],
+        {'language': ('language', Language), 'publisher': ('publisher', Publisher)},
+        {'authors': ('author', Author), 'genres': ('genre', Genre)},
+    ),
+    Item.ItemTypes.MAGAZINE: (
+        ['date', 'number'],
+        {'language': ('language', Language)},
+        {},
+    ),
+    Item.ItemTypes.FIGURE: (
+        ['character', 'model_name'],
+        {'brand': ('brand', Brand)},
+        {},
+    ),
+}
+
+
+def get_export_columns(item_types) -> list[str]:
+    """Колонки выгрузки товаров указанных типов"""
+    columns = list(ITEM_EXPORT_COLUMNS)
+    for item_type in item_types:
+        fields, foreign_keys, many_to_many = MAP_TYPE_TO_EXPORT[item_type]
+        for column in [*fields, *foreign_keys, *many_to_many]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def get_names(model, pks) -> dict:
+    """Названия объектов по первичному ключу"""
+    return dict(model.objects.filter(pk__in=pks).values_list('pk', 'name'))
+
+
+def get_related_names(model, field_name: str, pks) -> dict:
+    """Названия объектов связи ManyToMany по первичному ключу владельца"""
+    field = model._meta.get_field(field_name)
+    owner_column = f'{field.m2m_field_name()}_id'
+    names = (
+        field.remote_field.through.objects
+        .filter(**{f'{owner_column}__in': pks})
+        .order_by(owner_column, 'pk')
+        .values_list(owner_column, f'{field.m2m_reverse_field_name()}__name')
+    )
+    result = {}
+    for owner_pk, name in names:
+        result.setdefault(owner_pk, []).append(name)
+    return result
+
+
+def iter_chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_export_rows(user, item_types, chunk_size: int = 2000):
+    """
+    Строки выгрузки товаров с учетом возрастных ограничений.
+    Товары читаются серверным курсором (iterator), названия связанных объектов
+    загружаются отдельными запросами для каждой пачки из chunk_size строк,
+    поэтому потребление памяти не зависит от количества товаров.
+    :param user: пользователь, для которого применяется adult_control
+    :param item_types: типы товаров в порядке выгрузки
+    :param chunk_size: размер пачки
+    """
+    for item_type in item_types:
+        model = Item.get_children_map()[item_type]
+        fields, foreign_keys, many_to_many = MAP_TYPE_TO_EXPORT[item_type]
+        fk_columns = [f'{field_name}_id' for field_name, _ in foreign_keys.values()]
+        rows = (
+            model.objects.adult_control(user)
+            .order_by('pk')
+            .values('id', 'title', 'slug', 'price', 'count_available', *fields, *fk_columns)
+            .iterator(chunk_size=chunk_size)
+        )
+        for chunk in iter_chunks(rows, chunk_size):
+            pks = [row['id'] for row in chunk]
+            categories = get_related_names(Item, 'categories', pks)
+            related = {
+                column: get_related_names(model, field_name, pks)
+                for column, (field_name, _) in many_to_many.items()
+            }
+            names = {
+                column: get_names(related_model, {row[f'{field_name}_id'] for row in chunk})
+                for column, (field_name, related_model) in foreign_keys.items()
+            }
+            for row in chunk:
+                data = {
+                    'id': row['id'],
+                    'type': item_type,
+                    'title': row['title'],
+                    'slug': row['slug'],
+                    'price': row['price'],
+                    'count_available': row['count_available'],
+                    'categories': categories.get(row['id'], []),
+                }
+                data.update({field: row[field] for field in fields})
+                data.update({
+                    column: names[column].get(row[f'{field_name}_id'])
+                    for column, (field_name, _) in foreign_keys.items()
+                })
+                data.update({column: related[column].get(row['id'], []) for column in many_to_many})
+                yield data
@@ -0,0 +1,86 @@
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+
+from items.models import Book, Figure, Item, Magazine
+
+# Границы ценовых диапазонов фасета price: [0, 500), [500, 1000), ..., [5000, ∞)
+PRICE_FACET_BOUNDS = [500, 1000, 2000, 5000]
+
+# Фасет -> (модель, поле товара, поле значения, поле названия)
+MAP_FACET_TO_FIELDS = {
+    'categories': [(Item.categories.through, 'item_id', 'category_id', 'category__name')],
+    'genres': [(Book.genre.through, 'book_id', 'genre_id', 'genre__name')],
+    'languages': [
+        (Book, 'pk', 'language_id', 'language__name'),
+        (Magazine, 'pk', 'language_id', 'language__name'),
+    ],
+    'publishers': [(Book, 'pk', 'publisher_id', 'publisher__name')],
+    'brands': [(Figure, 'pk', 'brand_id', 'brand__name')],
+}
+
+
+def get_price_bucket():
+    """Номер ценового диапазона товара"""
+    return Case(
+        *(When(price__lt=bound, then=Value(index)) for index, bound in enumerate(PRICE_FACET_BOUNDS)),
+        default=Value(len(PRICE_FACET_BOUNDS)),
+        output_field=IntegerField(),
+    )
+
+
+def get_price_range(index: int) -> dict:
+    bounds = [0, *PRICE_FACET_BOUNDS, None]
+    return {'min': bounds[index], 'max': bounds[index + 1]}
+
+
+def get_facet_querysets(pks) -> list:
+    """
+    Запросы подсчета фасетов, каждая строка - (фасет, значение, название, количество)
+    :param pks: подзапрос первичных ключей отфильтрованных товаров
+    """
+    def facet_queryset(facet, queryset, value, name):
+        return (
+            queryset.order_by()
+            .annotate(facet=Value(facet, output_field=CharField()), value=value, name=name)
+            .values('facet', 'value', 'name')
+            .annotate(count=Count('*'))
+            .values_list('facet', 'value', 'name', 'count')
+        )
+
+    querysets = [
+        facet_queryset('total', Item.objects.filter(pk__in=pks), Value(0), Value('', output_field=CharField())),
+        facet_queryset('price', Item.objects.filter(pk__in=pks), get_price_bucket(),
+                       Value('', output_field=CharField())),
+    ]
+    for facet, sources in MAP_FACET_TO_FIELDS.items():
+        for model, item_field, value_field, name_field in sources:
+            queryset = model.objects.filter(**{f'{item_field}__in': pks})
+            querysets.append(facet_queryset(facet, queryset, F(value_field), F(name_field)))
+    return querysets
+
+
+def get_facets(queryset) -> dict:
+    """
+    Количество товаров по категориям, жанрам, языкам, издателям, брендам и ценовым диапазонам.
+    Все фасеты считаются одним запросом (UNION ALL группировок) по подзапросу
+    первичных ключей отфильтрованного queryset.
+    :param queryset: отфильтрованные товары (с учетом adult_control)
+    """
+    pks = queryset.order_by().values('pk')
+    querysets = get_facet_querysets(pks)
+    counts = {}
+    for facet, value, name, count in querysets[0].union(*querysets[1:], all=True):
+        key = (facet, value)
+        counts[key] = (name, counts.get(key, (name, 0))[1] + count)
+
+    result = {'total': counts.pop(('total', 0), ('', 0))[1]}
+    result['price'] = [
+        {**get_price_range(index), 'count': counts[('price', index)][1]}
+        for index in range(len(PRICE_FACET_BOUNDS) + 1) if ('price', index) in counts
+    ]
+    for facet in MAP_FACET_TO_FIELDS:
+        values = [
+            {'id': value, 'name': name, 'count': count}
+            for (value_facet, value), (name, count) in counts.items() if value_facet == facet
+        ]
+        result[facet] = sorted(values, key=lambda row: (-row['count'], row['name']))
+    return result
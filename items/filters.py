@@ -1,12 +1,191 @@
+import datetime
+
+from django import forms
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Exists, F, FloatField, OuterRef, Q
+from django.db.models.functions import Cast, Greatest
 from django_filters import rest_framework
+from rest_framework import filters
+
+from drf_store.settings import SEARCH_CONFIGS
+from items.models import Book, Item
+from utils.utils import transliterate_string
+
+SEARCH_MODE_PARAM = 'search_mode'
+
+
+def has_field(model, field_name: str) -> bool:
+    try:
+        model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def many_to_many_exists(model, field_name: str, **lookups) -> Exists:
+    """
+    Коррелированный EXISTS по промежуточной таблице связи ManyToMany model.field_name.
+    Подзапрос использует индекс (владелец, объект) промежуточной таблицы и не размножает строки товаров.
+    :param lookups: условия на связанный объект, например id__in=[1, 2]
+    """
+    field = model._meta.get_field(field_name)
+    return Exists(field.remote_field.through.objects.filter(
+        **{f'{field.m2m_field_name()}_id': OuterRef('pk')},
+        **{f'{field.m2m_reverse_field_name()}__{lookup}': value for lookup, value in lookups.items()}
+    ))
+
+
+def filter_child_field(queryset, field_name: str, **lookups):
+    """
+    Фильтрация по полю дочерней модели товара (language, publisher, brand, year).
+    Если поля нет в модели queryset (например, Item), условие проверяется
+    подзапросами EXISTS по первичному ключу дочерних моделей, у которых оно есть.
+    :param lookups: условия на поле, например language__in=[1, 2]
+    """
+    if has_field(queryset.model, field_name):
+        return queryset.filter(**lookups)
+    condition = Q()
+    for child in Item.get_children_map().values():
+        if has_field(child, field_name):
+            condition |= Exists(child._base_manager.filter(pk=OuterRef('pk'), **lookups))
+    return queryset.filter(condition) if condition else queryset.none()
 
-from items.models import Item
+
+class NumberInFilter(rest_framework.BaseInFilter, rest_framework.NumberFilter):
+    """Список чисел через запятую"""
+
+
+class YearFilter(rest_framework.NumberFilter):
+    """Год: целое число в диапазоне, допустимом для datetime.date"""
+    field_class = forms.IntegerField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('min_value', datetime.MINYEAR)
+        kwargs.setdefault('max_value', datetime.MAXYEAR)
+        super().__init__(*args, **kwargs)
 
 
 class ItemFilter(rest_framework.FilterSet):
-    min_price = rest_framework.NumberFilter(field_name="price", lookup_expr='gte')
-    max_price = rest_framework.NumberFilter(field_name="price", lookup_expr='lte')
+    """
+    Фильтры каталога.
+    Фильтры по связанным моделям компилируются в коррелированные подзапросы EXISTS,
+    поэтому не размножают строки товаров и не требуют DISTINCT.
+    Категории (?categories=1,2) по умолчанию объединяются по ИЛИ, с categories_mode=all - по И.
+    """
+    min_price = rest_framework.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = rest_framework.NumberFilter(field_name='price', lookup_expr='lte')
+    in_stock = rest_framework.BooleanFilter(method='filter_in_stock')
+    categories = NumberInFilter(method='filter_categories')
+    categories__name = rest_framework.CharFilter(method='filter_category_name')
+    author = NumberInFilter(method='filter_author')
+    genre = NumberInFilter(method='filter_genre')
+    language = NumberInFilter(method='filter_child_in')
+    publisher = NumberInFilter(method='filter_child_in')
+    brand = NumberInFilter(method='filter_child_in')
+    min_year = YearFilter(method='filter_min_year')
+    max_year = YearFilter(method='filter_max_year')
 
     class Meta:
         model = Item
-        fields = ['categories__name']
+        fields = []
+
+    @staticmethod
+    def filter_in_stock(queryset, name, value):
+        return queryset.filter(count_available__gt=0) if value else queryset.filter(count_available=0)
+
+    def filter_categories(self, queryset, name, value):
+        if self.data.get('categories_mode') == 'all':
+            for category_id in dict.fromkeys(value):
+                queryset = queryset.filter(many_to_many_exists(Item, 'categories', id=category_id))
+            return queryset
+        return queryset.filter(many_to_many_exists(Item, 'categories', id__in=value))
+
+    @staticmethod
+    def filter_category_name(queryset, name, value):
+        return queryset.filter(many_to_many_exists(Item, 'categories', name=value))
+
+    @staticmethod
+    def filter_author(queryset, name, value):
+        return queryset.filter(many_to_many_exists(Book, 'author', id__in=value))
+
+    @staticmethod
+    def filter_genre(queryset, name, value):
+        return queryset.filter(many_to_many_exists(Book, 'genre', id__in=value))
+
+    @staticmethod
+    def filter_child_in(queryset, name, value):
+        return filter_child_field(queryset, name, **{f'{name}__in': value})
+
+    @staticmethod
+    def filter_min_year(queryset, name, value):
+        return filter_child_field(queryset, 'year', year__gte=datetime.date(value, 1, 1))
+
+    @staticmethod
+    def filter_max_year(queryset, name, value):
+        return filter_child_field(queryset, 'year', year__lte=datetime.date(value, 12, 31))
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Полнотекстовый поиск по Item.search_vector (GIN индекс).
+    Найденные товары аннотируются релевантностью rank (ts_rank).
+    """
+    search_mode = 'fulltext'
+
+    def is_active(self, request):
+        return request.query_params.get(SEARCH_MODE_PARAM, FullTextSearchFilter.search_mode) == self.search_mode
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not self.is_active(request):
+            return queryset
+
+        query = self.get_search_query(' '.join(search_terms))
+        # ts_rank возвращает real, приводим к double precision, чтобы значение
+        # без потерь проходило через курсор пагинации
+        rank = Cast(SearchRank(F('search_vector'), query), output_field=FloatField())
+        return queryset.filter(search_vector=query).annotate(rank=rank)
+
+    @staticmethod
+    def get_search_query(value: str):
+        query = None
+        for config in SEARCH_CONFIGS:
+            config_query = SearchQuery(value, config=config, search_type='websearch')
+            query = config_query if query is None else query | config_query
+        return query
+
+
+class TrigramSearchFilter(FullTextSearchFilter):
+    """
+    Нечеткий поиск (search_mode=fuzzy) по названию и его транслитерации
+    с помощью pg_trgm (GIN индексы gin_trgm_ops).
+    Найденные товары аннотируются схожестью rank.
+    """
+    search_mode = 'fuzzy'
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not self.is_active(request):
+            return queryset
+
+        value = ' '.join(search_terms).lower()
+        value_translit = transliterate_string(value)
+        rank = Greatest(
+            TrigramSimilarity('title', value),
+            TrigramSimilarity('title_translit', value_translit),
+            output_field=FloatField()
+        )
+        return queryset.filter(
+            Q(title__trigram_similar=value) | Q(title_translit__trigram_similar=value_translit)
+        ).annotate(rank=Cast(rank, output_field=FloatField()))
+
+
+class CatalogOrderingFilter(filters.OrderingFilter):
+    """Сортировка каталога; результаты поиска по умолчанию сортируются по релевантности"""
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'rank' in queryset.query.annotations:
+            return ['-rank']
+        return super().get_ordering(request, queryset, view)
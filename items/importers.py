@@ -0,0 +1,249 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from items.bulk import bulk_create_items
+from items.cache import bump_generation
+from items.models import Author, Book, Category, Genre, Item, Language, Publisher
+from utils.utils import transliterate_string
+
+SLUG_MAX_LENGTH = Item._meta.get_field('slug').max_length
+
+# Поля строки импорта -> поле модели, ограничениям которого (длина, диапазон) должны соответствовать значения
+MAP_ROW_TO_FIELDS = {
+    'title': Item._meta.get_field('title'),
+    'price': Item._meta.get_field('price'),
+    'count_available': Item._meta.get_field('count_available'),
+    'language': Language._meta.get_field('name'),
+    'publisher': Publisher._meta.get_field('name'),
+    'authors': Author._meta.get_field('name'),
+    'genres': Genre._meta.get_field('name'),
+    'categories': Category._meta.get_field('name'),
+}
+
+
+class ImportRowError(ValueError):
+    """Ошибка в строке файла импорта"""
+
+
+def read_rows(file, file_format: str, list_separator: str = '|'):
+    """
+    Строки файла импорта в виде словарей.
+    Нечитаемая строка возвращается как ImportRowError, чтобы попасть в отчет об ошибках.
+    :param file: открытый текстовый файл
+    :param file_format: csv или jsonl
+    :param list_separator: разделитель списков (authors, genres, categories) в CSV
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield ImportRowError(f'invalid CSV: {e}')
+                continue
+            for key in ('authors', 'genres', 'categories'):
+                value = row.get(key) or ''
+                row[key] = [name.strip() for name in value.split(list_separator) if name.strip()]
+            yield row
+    elif file_format == 'jsonl':
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ImportRowError(f'invalid JSON: {e}')
+                continue
+            yield row if isinstance(row, dict) else ImportRowError('JSON object expected')
+    else:
+        raise ValueError(f'Unknown format {file_format}')
+
+
+def parse_year(value) -> datetime.date:
+    value = str(value).strip()
+    if value.isdigit():
+        return datetime.date(int(value), 1, 1)
+    return datetime.date.fromisoformat(value)
+
+
+def validate_row(row: dict) -> None:
+    """Проверка значений по ограничениям полей моделей, чтобы ошибка базы не прервала импорт пачки"""
+    for key, field in MAP_ROW_TO_FIELDS.items():
+        values = row[key] if isinstance(row[key], list) else [row[key]]
+        for value in values:
+            try:
+                field.run_validators(value)
+            except ValidationError as e:
+                raise ImportRowError(f'{key}: {" ".join(e.messages)}')
+            except TypeError:
+                raise ImportRowError(f'{key}: invalid value {value!r}')
+
+
+def clean_row(row: dict) -> dict:
+    """Проверка и приведение значений строки импорта"""
+    title = (row.get('title') or '').strip()
+    language = (row.get('language') or '').strip()
+    publisher = (row.get('publisher') or '').strip()
+    if not title or not language or not publisher:
+        raise ImportRowError('title, language and publisher are required')
+    try:
+        cleaned = {
+            'title': title,
+            'description': row.get('description') or '',
+            'price': int(row['price']),
+            'count_available': int(row.get('count_available') or 0),
+            'year': parse_year(row['year']),
+            'slug': (row.get('slug') or '').strip(),
+            'language': language,
+            'language_code': (row.get('language_code') or language[:2]).strip().upper(),
+            'publisher': publisher,
+            'authors': list(row.get('authors') or []),
+            'genres': list(row.get('genres') or []),
+            'categories': list(row.get('categories') or []),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ImportRowError(f'invalid value: {e!r}')
+    validate_row(cleaned)
+    return cleaned
+
+
+def get_or_create_by_name(model, names, **defaults) -> dict:
+    """
+    Объекты справочника по названию, отсутствующие создаются одним запросом
+    :return: {название: первичный ключ}
+    """
+    names = set(names)
+    if not names:
+        return {}
+    result = {}
+    for name, pk in model.objects.filter(name__in=names).order_by('-pk').values_list('name', 'pk'):
+        result[name] = pk
+    missing = names - result.keys()
+    if missing:
+        model.objects.bulk_create([model(name=name, **defaults) for name in sorted(missing)], ignore_conflicts=True)
+        result.update(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+    return result
+
+
+def get_or_create_languages(pairs) -> dict:
+    """
+    Языки по названию (код используется для создания отсутствующих)
+    :param pairs: пары (название, код)
+    :return: {название: первичный ключ}
+    """
+    codes = dict(pairs)
+    if not codes:
+        return {}
+    result = dict(Language.objects.filter(name__in=codes).order_by('-pk').values_list('name', 'pk'))
+    missing = codes.keys() - result.keys()
+    if missing:
+        Language.objects.bulk_create(
+            [Language(name=name, code=codes[name][:5]) for name in sorted(missing)],
+            ignore_conflicts=True
+        )
+        result.update(Language.objects.filter(name__in=missing).values_list('name', 'pk'))
+    return result
+
+
+def resolve_slugs(rows) -> None:
+    """
+    Уникальные slug для пачки строк.
+    Занятость проверяется одним запросом slug__in на все кандидаты пачки:
+    строкам, чей кандидат занят, предлагается следующий числовой суффикс, и проверка повторяется.
+    """
+    bases = [(row['slug'] or transliterate_string(row['title'].lower()))[:SLUG_MAX_LENGTH] or 'item' for row in rows]
+    numbers = {}
+    proposed = set()
+
+    def next_candidate(base: str) -> str:
+        numbers[base] = numbers.get(base, 0) + 1
+        if numbers[base] == 1:
+            return base
+        suffix = f'-{numbers[base]}'
+        return f'{base[:SLUG_MAX_LENGTH - len(suffix)]}{suffix}'
+
+    pending = list(range(len(rows)))
+    while pending:
+        candidates = {}
+        for index in pending:
+            slug = next_candidate(bases[index])
+            while slug in proposed:
+                slug = next_candidate(bases[index])
+            proposed.add(slug)
+            candidates[slug] = index
+
+        taken = set(Item.objects.filter(slug__in=candidates).values_list('slug', flat=True))
+        pending = []
+        for slug, index in candidates.items():
+            if slug in taken:
+                pending.append(index)
+            else:
+                rows[index]['slug'] = slug
+
+
+class BookImporter:
+    """
+    Пакетный импорт книг.
+    Для каждой пачки справочники получаются/создаются одним запросом на модель,
+    книги создаются пачкой через items.bulk.bulk_create_items.
+    """
+
+    def __init__(self, batch_size: int = 2000):
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows) -> int:
+        """
+        :param rows: словари строк файла импорта
+        :return: количество созданных книг, ошибки сохраняются в self.errors
+        """
+        rows = iter(enumerate(rows, start=1))
+        while batch := list(islice(rows, self.batch_size)):
+            cleaned = []
+            for line, row in batch:
+                try:
+                    if isinstance(row, ImportRowError):
+                        raise row
+                    cleaned.append(clean_row(row))
+                except ImportRowError as e:
+                    self.errors.append((line, str(e)))
+            if cleaned:
+                self.import_batch(cleaned)
+        if self.created:
+            bump_generation(Item, Book, Author, Genre, Publisher, Language, Category)
+        return self.created
+
+    @transaction.atomic
+    def import_batch(self, rows: list[dict]) -> None:
+        languages = get_or_create_languages((row['language'], row['language_code']) for row in rows)
+        publishers = get_or_create_by_name(Publisher, (row['publisher'] for row in rows), address='')
+        authors = get_or_create_by_name(Author, (name for row in rows for name in row['authors']))
+        genres = get_or_create_by_name(Genre, (name for row in rows for name in row['genres']))
+        categories = get_or_create_by_name(Category, (name for row in rows for name in row['categories']))
+        resolve_slugs(rows)
+
+        books = bulk_create_items(Book, [
+            {
+                'title': row['title'],
+                'description': row['description'],
+                'price': row['price'],
+                'count_available': row['count_available'],
+                'slug': row['slug'],
+                'year': row['year'],
+                'language_id': languages[row['language']],
+                'publisher_id': publishers[row['publisher']],
+                'author': [Author(pk=authors[name]) for name in dict.fromkeys(row['authors'])],
+                'genre': [Genre(pk=genres[name]) for name in dict.fromkeys(row['genres'])],
+                'categories': [Category(pk=categories[name]) for name in dict.fromkeys(row['categories'])],
+            }
+            for row in rows
+        ])
+        self.created += len(books)
@@ -0,0 +1,59 @@
+import datetime
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from items.models import Book
+from items.serializers import GetBookSerializer
+from utils.renderers import FastJSONRenderer, orjson
+from utils.values_serializer import ValuesSerializer
+
+
+def get_synthetic_books(count: int) -> list[dict]:
+    """Список книг в формате GetBookSerializer без обращения к базе"""
+    return [
+        {
+            'id': i,
+            'categories': [{'id': 1, 'name': 'Фантастика', 'description': 'Книги в жанре фантастики'}],
+            'author': [{'id': i % 100, 'name': f'Автор {i % 100}'}],
+            'genre': [{'id': 1, 'name': 'Роман'}],
+            'language': {'id': 1, 'code': 'RU', 'name': 'Русский'},
+            'publisher': {'id': i % 10, 'name': f'Издательство {i % 10}'},
+            'title': f'Книга {i}',
+            'description': 'Описание книги ' * 10,
+            'count_available': i % 50,
+            'price': 100 + i % 5000,
+            'photo': f'http://testserver/media/items/photo/{i}.jpg',
+            'slug': f'kniga-{i}',
+            'year': datetime.date(2000, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare FastJSONRenderer with the default JSONRenderer on a list of books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of books')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of measurements')
+        parser.add_argument('--from-db', action='store_true', help='Serialize books from database')
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            values_serializer = ValuesSerializer.compile(GetBookSerializer)
+            data = values_serializer.represent(values_serializer.get_rows(Book.objects.all()[:options['count']]))
+        else:
+            data = get_synthetic_books(options['count'])
+
+        self.stdout.write(f'Books: {len(data)}, orjson: {"yes" if orjson is not None else "no"}')
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            timer = timeit.Timer(lambda: renderer.render(data))
+            results[renderer.__class__.__name__] = min(timer.repeat(repeat=options['repeat'], number=1))
+
+        for name, seconds in results.items():
+            self.stdout.write(f'{name}: {seconds * 1000:.1f} ms')
+        speedup = results['JSONRenderer'] / results['FastJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {speedup:.1f}x'))
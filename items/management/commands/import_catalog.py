@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from items.importers import BookImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import books from CSV or JSONL file (authors, genres, categories are lists, "|"-separated in CSV)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path to CSV or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format, by default from extension')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--list-separator', default='|', help='Separator of lists in CSV')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['file'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Unknown file format, use --format')
+
+        started = time.monotonic()
+        importer = BookImporter(batch_size=options['batch_size'])
+        try:
+            with open(options['file'], encoding='utf-8', newline='') as file:
+                importer.run(read_rows(file, file_format, options['list_separator']))
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, error in importer.errors:
+            self.stderr.write(f'Line {line}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} books in {time.monotonic() - started:.1f}s, errors: {len(importer.errors)}'
+        ))
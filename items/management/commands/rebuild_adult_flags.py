@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from items.cache import bump_generation
+from items.models import Item
+
+
+class Command(BaseCommand):
+    help = 'Rebuild is_adult flag of items, e.g. after ADULT_CATEGORIES was changed'
+
+    def handle(self, *args, **options):
+        updated = Item.objects.update_adult_flag()
+        bump_generation(Item)
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} items'))
@@ -1,6 +1,11 @@
-from django.db import models
+from django.apps import apps
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import models, transaction
+from django.db.models import (Case, Exists, F, IntegerField, OuterRef, Subquery,
+                              Value, When)
 
-from drf_store.settings import ADULT_CATEGORIES
+from drf_store.settings import ADULT_CATEGORIES, SEARCH_CONFIGS
 
 
 class ControlAdultMixin:
@@ -16,7 +21,105 @@ class AdultFilteredItems(ControlAdultMixin, models.Manager):
         result = super(AdultFilteredItems, self).get_queryset()
         if self.user_is_adult(user) or user.is_superuser:
             return result
-        return result.exclude(categories__name__in=ADULT_CATEGORIES)
+        return result.filter(is_adult=False)
+
+    def update_adult_flag(self, pks=None):
+        """
+        Recalculate is_adult flag of items by their categories.
+        Only items with changed flag are updated.
+        :param pks: primary keys (or subquery) of items, all items if None
+        :return: number of updated items
+        """
+        queryset = super(AdultFilteredItems, self).get_queryset()
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        adult_categories = Exists(self.model.categories.through.objects.filter(
+            item_id=OuterRef('pk'),
+            category__name__in=ADULT_CATEGORIES
+        ))
+        return queryset.exclude(is_adult=adult_categories).update(is_adult=adult_categories)
+
+    def reserve(self, pk, quantity: int = 1) -> bool:
+        """
+        Atomically decrease stock of item by quantity if enough items are available.
+        One conditional UPDATE: concurrent reservations can not oversell or lose updates.
+        :return: True if item is reserved
+        """
+        if quantity <= 0:
+            return False
+        return bool(
+            super(AdultFilteredItems, self).get_queryset()
+            .filter(pk=pk, count_available__gte=quantity)
+            .update(count_available=F('count_available') - quantity)
+        )
+
+    def reserve_many(self, quantities: dict) -> bool:
+        """
+        Atomically decrease stock of several items, all or nothing.
+        One conditional UPDATE for all items: if any item has not enough stock, nothing is reserved.
+        :param quantities: {item pk: quantity}
+        :return: True if all items are reserved
+        """
+        if not quantities or min(quantities.values()) <= 0:
+            return False
+        quantity = Case(
+            *(When(pk=pk, then=Value(value)) for pk, value in quantities.items()),
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            updated = (
+                super(AdultFilteredItems, self).get_queryset()
+                .filter(pk__in=quantities, count_available__gte=quantity)
+                .update(count_available=F('count_available') - quantity)
+            )
+            if updated != len(quantities):
+                transaction.set_rollback(True)
+                return False
+        return True
+
+    def restock(self, pk, quantity: int = 1) -> int:
+        """Atomically return quantity of item to stock"""
+        return (
+            super(AdultFilteredItems, self).get_queryset()
+            .filter(pk=pk)
+            .update(count_available=F('count_available') + quantity)
+        )
+
+    def update_search_vector(self, pks=None):
+        """
+        Recalculate search_vector of items (title, description, authors, publisher, brand)
+        :param pks: primary keys (or subquery) of items, all items if None
+        :return: number of updated items
+        """
+        queryset = super(AdultFilteredItems, self).get_queryset()
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        return queryset.update(search_vector=self.get_search_vector())
+
+    @staticmethod
+    def get_search_vector():
+        """Expression of search vector for every configuration from SEARCH_CONFIGS"""
+        book_model = apps.get_model('items', 'Book')
+        figure_model = apps.get_model('items', 'Figure')
+        authors = Subquery(
+            book_model.author.through.objects
+            .filter(book_id=OuterRef('pk'))
+            .values('book_id')
+            .annotate(names=StringAgg('author__name', ' '))
+            .values('names')
+        )
+        publisher = Subquery(book_model.objects.filter(pk=OuterRef('pk')).values('publisher__name'))
+        brand = Subquery(figure_model.objects.filter(pk=OuterRef('pk')).values('brand__name'))
+
+        vector = None
+        for config in SEARCH_CONFIGS:
+            config_vector = (
+                SearchVector('title', weight='A', config=config)
+                + SearchVector(authors, publisher, brand, weight='B', config=config)
+                + SearchVector('description', weight='C', config=config)
+            )
+            vector = config_vector if vector is None else vector + config_vector
+        return vector
 
 
 class AdultFilteredCategory(ControlAdultMixin, models.Manager):
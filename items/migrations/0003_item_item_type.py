@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+ITEM_CHILDREN = ['book', 'magazine', 'figure']
+
+
+def fill_item_type(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    for child in ITEM_CHILDREN:
+        Child = apps.get_model('items', child)
+        Item.objects.filter(pk__in=Child.objects.values('pk')).update(item_type=child)
+
+
+def clear_item_type(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    Item.objects.update(item_type='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0002_remove_item_category_item_categories_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='item_type',
+            field=models.CharField(blank=True, choices=[('book', 'Book'), ('magazine', 'magazine'), ('figure', 'figure')], db_index=True, editable=False, max_length=10, verbose_name='type'),
+        ),
+        migrations.RunPython(fill_item_type, clear_item_type),
+    ]
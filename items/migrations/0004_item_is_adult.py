@@ -0,0 +1,30 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def fill_is_adult(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    adult_categories = Item.categories.through.objects.filter(
+        item_id=OuterRef('pk'),
+        category__name__in=settings.ADULT_CATEGORIES
+    )
+    Item.objects.update(is_adult=Exists(adult_categories))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_item_item_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='is_adult',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='adult content'),
+        ),
+        migrations.RunPython(fill_is_adult, migrations.RunPython.noop),
+    ]
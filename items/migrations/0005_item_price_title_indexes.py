@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0004_item_is_adult'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['price', 'id'], name='items_item_price_bc8058_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['title', 'id'], name='items_item_title_ce5d44_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:45
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vector(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    Book = apps.get_model('items', 'Book')
+    Figure = apps.get_model('items', 'Figure')
+    authors = Subquery(
+        Book.author.through.objects
+        .filter(book_id=OuterRef('pk'))
+        .values('book_id')
+        .annotate(names=StringAgg('author__name', ' '))
+        .values('names')
+    )
+    publisher = Subquery(Book.objects.filter(pk=OuterRef('pk')).values('publisher__name'))
+    brand = Subquery(Figure.objects.filter(pk=OuterRef('pk')).values('brand__name'))
+
+    vector = None
+    for config in settings.SEARCH_CONFIGS:
+        config_vector = (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector(authors, publisher, brand, weight='B', config=config)
+            + SearchVector('description', weight='C', config=config)
+        )
+        vector = config_vector if vector is None else vector + config_vector
+    Item.objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_item_price_title_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='items_item_search__776677_gin'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
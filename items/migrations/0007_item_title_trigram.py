@@ -0,0 +1,44 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:46
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from utils.utils import transliterate_string
+
+
+def fill_title_translit(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    items = []
+    for item in Item.objects.only('id', 'title').iterator(chunk_size=2000):
+        item.title_translit = transliterate_string(item.title.lower())
+        items.append(item)
+        if len(items) >= 2000:
+            Item.objects.bulk_update(items, ['title_translit'])
+            items = []
+    Item.objects.bulk_update(items, ['title_translit'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_item_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='item',
+            name='title_translit',
+            field=models.CharField(blank=True, editable=False, max_length=280, verbose_name='transliterated title'),
+        ),
+        migrations.RunPython(fill_title_translit, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='items_item_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title_translit'], name='items_item_translit_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
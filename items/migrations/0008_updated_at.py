@@ -0,0 +1,48 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0007_item_title_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='language',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at'),
+        ),
+    ]
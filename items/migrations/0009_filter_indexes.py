@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+
+# Индексы (объект, владелец) промежуточных таблиц ManyToMany для фильтров EXISTS,
+# начинающихся со связанного объекта; индексы (владелец, объект) создает ограничение уникальности.
+# Для автоматически созданных промежуточных моделей Meta.indexes недоступен.
+THROUGH_INDEXES = [
+    ('items_item_categories', 'category_id', 'item_id'),
+    ('items_book_author', 'author_id', 'book_id'),
+    ('items_book_genre', 'genre_id', 'book_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['year'], name='items_book_year_4a736e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('count_available__gt', 0)), fields=['id'], name='items_item_in_stock_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX {table}_{target}_{owner}_idx ON {table} ({target}, {owner})',
+            f'DROP INDEX {table}_{target}_{owner}_idx',
+        )
+        for table, target, owner in THROUGH_INDEXES
+    ]
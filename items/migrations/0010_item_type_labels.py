@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0009_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='item_type',
+            field=models.CharField(blank=True, choices=[('book', 'Book'), ('magazine', 'Magazine'), ('figure', 'Figure')], db_index=True, editable=False, max_length=10, verbose_name='type'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_item_type_labels'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='author',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='brand',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='category',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='genre',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='language',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='publisher',
+            name='updated_at',
+        ),
+    ]
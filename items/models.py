@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
@@ -84,13 +86,30 @@ class Brand(models.Model):
 
 
 class Item(models.Model):
+
+    class ItemTypes(models.TextChoices):
+        BOOK = 'book', _('Book')
+        MAGAZINE = 'magazine', _('Magazine')
+        FIGURE = 'figure', _('Figure')
+
     title = models.CharField(_('title'), max_length=70)
+    title_translit = models.CharField(_('transliterated title'), max_length=280, blank=True, editable=False)
     description = models.TextField(_('description'), blank=True)
     categories = models.ManyToManyField(to=Category, blank=True, verbose_name=_('Категории'))
     count_available = models.PositiveSmallIntegerField(_('count available'), default=0, blank=False)
     price = models.PositiveIntegerField(_('price'))
     photo = models.ImageField(verbose_name=_('photo'), upload_to='items/photo/', blank=True, null=True)
     slug = models.SlugField(_('URL'), unique=True, blank=False)
+    item_type = models.CharField(
+        _('type'),
+        max_length=10,
+        choices=ItemTypes.choices,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
+    is_adult = models.BooleanField(_('adult content'), default=False, db_index=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = AdultFilteredItems()
 
@@ -99,35 +118,49 @@ class Item(models.Model):
     class Meta:
         verbose_name = _('Item')
         verbose_name_plural = _('Items')
+        indexes = [
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['title', 'id']),
+            models.Index(name='items_item_in_stock_idx', fields=['id'], condition=models.Q(count_available__gt=0)),
+            GinIndex(fields=['search_vector']),
+            GinIndex(name='items_item_title_trgm', fields=['title'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='items_item_translit_trgm', fields=['title_translit'], opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self._meta.model_name in Item.get_children_list():
+            self.item_type = self._meta.model_name
+        self.title_translit = transliterate_string(self.title.lower())
+        super(Item, self).save(*args, **kwargs)
+
     def save_with_slug(self, *args, **kwargs):
         self.slug = transliterate_string(self.title.lower())
-        super(Item, self).save(*args, **kwargs)
+        self.save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('items:item', kwargs={'slug': self.slug})
 
     @property
     def path_template_ext(self):
-        children = self.get_children_list()
-        for child in children:
-            if hasattr(self, child):
-                return getattr(self, child).path_template
+        child = Item.get_children_map().get(self.item_type)
+        if child is not None:
+            return child.path_template
         return self.path_template
 
     @classmethod
     def get_children_list(cls):
         return [child.__name__.lower() for child in cls.__subclasses__()]
 
+    @classmethod
+    def get_children_map(cls):
+        return {child.__name__.lower(): child for child in cls.__subclasses__()}
+
     @property
     def get_type_item(self):
-        children = self.get_children_list()
-        for child in children:
-            if hasattr(self, child):
-                return child
+        return self.item_type or None
 
 
 class Book(Item):
@@ -142,6 +175,9 @@ class Book(Item):
     class Meta:
         verbose_name = _('Book')
         verbose_name_plural = _('Books')
+        indexes = [
+            models.Index(fields=['year']),
+        ]
 
     @admin.display(description='Author')
     def get_authors(self):
@@ -0,0 +1,145 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class RowComparison(models.Func):
+    """Сравнение строк (a, b) > (x, y) одним условием, Postgres использует составной индекс (a, b)"""
+    template = '%(expressions)s'
+    output_field = models.BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.arg_joiner = f' {operator} '
+        super().__init__(
+            models.Func(*fields, function='', arg_joiner=', '),
+            models.Func(*values, function='', arg_joiner=', '),
+        )
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Постраничный вывод каталога по курсору (keyset) вместо OFFSET:
+    стоимость запроса любой страницы одинакова.
+    Курсор хранит значения всех полей сортировки (последним всегда идет id),
+    поэтому равные значения цены или названия не приводят к сдвигу через OFFSET.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        """Добавляем id к сортировке, чтобы позиция в курсоре была уникальной"""
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('-id',) if ordering[0].startswith('-') else ('id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (False, None) if self.cursor is None else (self.cursor.reverse, self.cursor.position)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.get_position_values(queryset, ordering, position)
+            queryset = queryset.filter(self.get_position_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_following
+        else:
+            self.has_next, self.has_previous = has_following, position is not None
+
+        # На пустой странице не от чего строить курсоры
+        if not self.page:
+            self.has_next = self.has_previous = False
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_values(self, queryset, ordering, position):
+        """Приводим значения из курсора к типам полей сортировки"""
+        values = []
+        for field, value in zip(ordering, position):
+            field = field.lstrip('-')
+            if field in queryset.query.annotations:
+                model_field = queryset.query.annotations[field].output_field
+            elif field == 'pk':
+                model_field = queryset.model._meta.pk
+            else:
+                model_field = queryset.model._meta.get_field(field)
+            try:
+                values.append(model_field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def get_position_filter(ordering, position):
+        """Условие "после позиции" для сортировки ordering"""
+        fields = [field.lstrip('-') for field in ordering]
+        descending = [field.startswith('-') for field in ordering]
+        if len(set(descending)) == 1:
+            return RowComparison(
+                [models.F(field) for field in fields],
+                '<' if descending[0] else '>',
+                [models.Value(value) for value in position],
+            )
+
+        # Разные направления сортировки: сравнение строк неприменимо, раскрываем его по полям
+        condition = models.Q()
+        for i, (field, value) in enumerate(zip(fields, position)):
+            lookup = 'lt' if descending[i] else 'gt'
+            equal = dict(zip(fields[:i], position[:i]))
+            condition |= models.Q(**equal, **{f'{field}__{lookup}': value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list) or len(position) != len(self.ordering)
+                or not all(isinstance(value, str) for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return [str(instance[field]) for field in fields]
+        return [str(getattr(instance, field)) for field in fields]
@@ -1,8 +1,171 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from items.bulk import bulk_create_items, bulk_update_items
 from items.models import (Author, Book, Brand, Category, Figure, Genre, Item,
                           Language, Magazine, Publisher)
 
+# Служебные поля товара, которые не отдаются в API; тип товара выводится полем type
+ITEM_EXCLUDED_FIELDS = ['search_vector', 'title_translit', 'is_adult', 'item_type']
+
+
+class ItemTypeField(serializers.CharField):
+    """Тип товара, пустой тип выводится как null"""
+
+    def to_representation(self, value):
+        return value or None
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Связь по первичному ключу, которая при пакетной проверке (BatchListSerializer)
+    берет объекты из заранее загруженных, а не запрашивает каждый ключ отдельно
+    """
+
+    def get_batch_objects(self):
+        field = self.parent if isinstance(self.parent, serializers.ManyRelatedField) else self
+        related_objects = getattr(self.root, 'related_objects', None)
+        return related_objects.get(field.field_name) if related_objects is not None else None
+
+    def to_internal_value(self, data):
+        objects = self.get_batch_objects()
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail('does_not_exist', pk_value=data)
+        return objects[pk]
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Пакетное создание и изменение товаров.
+    Связанные объекты загружаются одним запросом на поле, уникальность проверяется
+    одним запросом на поле для всей пачки, ошибки возвращаются списком по элементам.
+    При изменении self.instance - список товаров, каждый элемент данных указывает свой id.
+    """
+    default_error_messages = {
+        'does_not_exist': _('Item with id "{pk_value}" does not exist.'),
+    }
+    related_objects = None
+
+    def get_related_fields(self) -> dict:
+        fields = {}
+        for name, field in self.child.fields.items():
+            relation = field.child_relation if isinstance(field, serializers.ManyRelatedField) else field
+            if not field.read_only and isinstance(relation, BatchPrimaryKeyRelatedField):
+                fields[name] = (field, relation)
+        return fields
+
+    def load_related_objects(self, data: list) -> dict:
+        """Связанные объекты всех элементов пачки: {имя поля: {pk: объект}}"""
+        related_objects = {}
+        for name, (field, relation) in self.get_related_fields().items():
+            pk_field = relation.get_queryset().model._meta.pk
+            pks = set()
+            for item in data:
+                values = item.get(name) if isinstance(item, dict) else None
+                if values is None:
+                    continue
+                if not isinstance(field, serializers.ManyRelatedField):
+                    values = [values]
+                elif not isinstance(values, list):
+                    continue
+                for value in values:
+                    try:
+                        pks.add(pk_field.to_python(value))
+                    except (TypeError, ValueError, DjangoValidationError):
+                        pass
+            related_objects[name] = relation.get_queryset().in_bulk(pks)
+        return related_objects
+
+    def pop_unique_validators(self) -> dict:
+        """Отключение поэлементной проверки уникальности: {имя поля: UniqueValidator}"""
+        unique = {}
+        for name, field in self.child.fields.items():
+            validators = [validator for validator in field.validators if isinstance(validator, UniqueValidator)]
+            if validators and not field.read_only:
+                unique[name] = validators[0]
+                field.validators = [validator for validator in field.validators if validator not in validators]
+        return unique
+
+    def get_instances(self, data: list) -> list:
+        """Изменяемые товары в порядке элементов данных (None, если товар не найден)"""
+        if self.instance is None:
+            return [None] * len(data)
+        pk_field = self.child.Meta.model._meta.pk
+        instances = {obj.pk: obj for obj in self.instance}
+        result = []
+        for item in data:
+            try:
+                result.append(instances.get(pk_field.to_python(item.get('id'))))
+            except (AttributeError, TypeError, ValueError, DjangoValidationError):
+                result.append(None)
+        return result
+
+    def check_unique(self, unique: dict, validated: list, instances: list, errors: list) -> None:
+        for name, validator in unique.items():
+            values = {}
+            for index, data in enumerate(validated):
+                if data is not None and name in data:
+                    values.setdefault(data[name], []).append(index)
+            taken = validator.queryset.filter(**{f'{name}__in': values}).values_list(name, 'pk')
+            for value, pk in taken:
+                for index in values[value]:
+                    if instances[index] is None or instances[index].pk != pk:
+                        errors[index].setdefault(name, []).append(validator.message)
+            for indexes in values.values():
+                for index in indexes[1:]:
+                    errors[index].setdefault(name, []).append(validator.message)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        self.related_objects = self.load_related_objects(data)
+        unique = self.pop_unique_validators()
+        instances = self.get_instances(data)
+        validated, errors = [], []
+        try:
+            for item, instance in zip(data, instances):
+                if self.instance is not None and instance is None:
+                    validated.append(None)
+                    pk_value = item.get('id') if isinstance(item, dict) else None
+                    errors.append({'id': [self.error_messages['does_not_exist'].format(pk_value=pk_value)]})
+                    continue
+                self.child.instance = instance
+                try:
+                    validated.append(self.child.run_validation(item))
+                    errors.append({})
+                except serializers.ValidationError as exc:
+                    validated.append(None)
+                    errors.append(exc.detail)
+        finally:
+            self.child.instance = None
+            self.related_objects = None
+        self.check_unique(unique, validated, instances, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        self.validated_instances = instances
+        return validated
+
+    def create(self, validated_data):
+        return bulk_create_items(self.child.Meta.model, validated_data)
+
+    def update(self, instance, validated_data):
+        return bulk_update_items(self.child.Meta.model, self.validated_instances, validated_data)
+
+
+class BatchModelSerializer(serializers.ModelSerializer):
+    """Сериализатор записи товара, поддерживающий пакетную проверку (many=True)"""
+    serializer_related_field = BatchPrimaryKeyRelatedField
+
 
 class LanguageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -100,19 +263,20 @@ class GetBookSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
 
 
-class PostBookSerializer(serializers.ModelSerializer):
-    categories = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), many=True, required=False)
-    author = serializers.PrimaryKeyRelatedField(queryset=Author.objects.all(), many=True)
-    genre = serializers.PrimaryKeyRelatedField(queryset=Genre.objects.all(), many=True)
-    language = serializers.PrimaryKeyRelatedField(queryset=Language.objects.all())
-    publisher = serializers.PrimaryKeyRelatedField(queryset=Publisher.objects.all())
+class PostBookSerializer(BatchModelSerializer):
+    categories = BatchPrimaryKeyRelatedField(queryset=Category.objects.all(), many=True, required=False)
+    author = BatchPrimaryKeyRelatedField(queryset=Author.objects.all(), many=True)
+    genre = BatchPrimaryKeyRelatedField(queryset=Genre.objects.all(), many=True)
+    language = BatchPrimaryKeyRelatedField(queryset=Language.objects.all())
+    publisher = BatchPrimaryKeyRelatedField(queryset=Publisher.objects.all())
 
     class Meta:
         model = Book
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
+        list_serializer_class = BatchListSerializer
 
 
 class GetFigureSerializer(serializers.ModelSerializer):
@@ -121,15 +285,16 @@ class GetFigureSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Figure
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
 
 
-class PostFigureSerializer(serializers.ModelSerializer):
-    brand = serializers.PrimaryKeyRelatedField(queryset=Brand.objects.all())
+class PostFigureSerializer(BatchModelSerializer):
+    brand = BatchPrimaryKeyRelatedField(queryset=Brand.objects.all())
 
     class Meta:
         model = Figure
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
+        list_serializer_class = BatchListSerializer
 
 
 class GetMagazineSerializer(serializers.ModelSerializer):
@@ -138,20 +303,21 @@ class GetMagazineSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Magazine
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
 
 
-class PostMagazineSerializer(serializers.ModelSerializer):
-    language = serializers.PrimaryKeyRelatedField(queryset=Language.objects.all())
+class PostMagazineSerializer(BatchModelSerializer):
+    language = BatchPrimaryKeyRelatedField(queryset=Language.objects.all())
 
     class Meta:
         model = Magazine
-        fields = '__all__'
+        exclude = ITEM_EXCLUDED_FIELDS
+        list_serializer_class = BatchListSerializer
 
 
 class ItemSerializer(serializers.ModelSerializer):
     categories = CategorySerializer(many=True)
-    type = serializers.CharField(source='get_type_item', read_only=True)
+    type = ItemTypeField(source='item_type', read_only=True)
 
     class Meta:
         model = Item
@@ -169,7 +335,7 @@ class ItemSerializer(serializers.ModelSerializer):
 
 
 class ItemServiceSerializer(serializers.ModelSerializer):
-    type = serializers.CharField(source='get_type_item', read_only=True)
+    type = ItemTypeField(source='item_type', read_only=True)
 
     class Meta:
         model = Item
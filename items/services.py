@@ -0,0 +1,36 @@
+from items.models import Book, Figure, Item, Magazine
+from items.serializers import (GetBookSerializer, GetFigureSerializer,
+                               GetMagazineSerializer, ItemSerializer)
+
+# Тип товара -> (модель, сериализатор, select_related, prefetch_related)
+MAP_TYPE_TO_DETAILS = {
+    Item.ItemTypes.BOOK: (Book, GetBookSerializer, ['language', 'publisher'], ['categories', 'author', 'genre']),
+    Item.ItemTypes.MAGAZINE: (Magazine, GetMagazineSerializer, ['language'], ['categories']),
+    Item.ItemTypes.FIGURE: (Figure, GetFigureSerializer, ['brand'], ['categories']),
+    '': (Item, ItemSerializer, [], ['categories']),
+}
+
+
+def get_expanded_items(items, context: dict) -> list[dict]:
+    """
+    Данные товаров вместе с полями дочерних моделей.
+    Для каждого типа товара выполняется один запрос (плюс prefetch связанных моделей),
+    поэтому количество запросов не зависит от количества товаров.
+    :param items: товары (Item) в порядке вывода
+    :param context: контекст сериализатора
+    :return: список данных товаров в исходном порядке
+    """
+    items = list(items)
+    pks_by_type = {}
+    for item in items:
+        pks_by_type.setdefault(item.item_type, []).append(item.pk)
+
+    data_by_pk = {}
+    for item_type, pks in pks_by_type.items():
+        model, serializer_class, related, prefetch = MAP_TYPE_TO_DETAILS[item_type]
+        objs = list(model.objects.filter(pk__in=pks).select_related(*related).prefetch_related(*prefetch))
+        for obj, data in zip(objs, serializer_class(objs, many=True, context=context).data):
+            data['type'] = item_type or None
+            data_by_pk[obj.pk] = data
+
+    return [data_by_pk[item.pk] for item in items]
@@ -0,0 +1,130 @@
+from django.apps import apps
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+
+from drf_store.settings import ADULT_CATEGORIES
+from items.cache import bump_generation
+from items.models import (Author, Book, Brand, Category, Figure, Item, Magazine,
+                          Publisher)
+
+# Цены товаров изменены пакетно, без save() (аргумент pks - первичные ключи товаров)
+items_repriced = Signal()
+
+
+def get_m2m_changed_items(instance, action, reverse, pk_set, related_name):
+    """
+    Primary keys of items affected by many-to-many change
+    :return: list of primary keys or None if the relation is not changed yet
+    """
+    if action == 'pre_clear' and reverse:
+        instance._m2m_cleared_pks = list(getattr(instance, related_name).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return None
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return instance.__dict__.pop('_m2m_cleared_pks', [])
+    return list(pk_set)
+
+
+@receiver(m2m_changed, sender=Item.categories.through)
+def update_item_on_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = get_m2m_changed_items(instance, action, reverse, pk_set, 'item_set')
+    if pks is None:
+        return
+
+    Item.objects.update_adult_flag(pks)
+    if not reverse:
+        instance.refresh_from_db(fields=['is_adult'])
+
+
+@receiver(pre_save, sender=Category)
+def check_category_adult_changed(sender, instance, **kwargs):
+    old_name = Category.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    instance._adult_changed = old_name is not None and \
+        (old_name in ADULT_CATEGORIES) != (instance.name in ADULT_CATEGORIES)
+
+
+@receiver(post_save, sender=Category)
+def update_adult_flag_on_category_renamed(sender, instance, created, **kwargs):
+    if instance.__dict__.pop('_adult_changed', False):
+        Item.objects.update_adult_flag(instance.item_set.values('pk'))
+
+
+@receiver(pre_delete, sender=Category)
+def collect_items_of_adult_category(sender, instance, **kwargs):
+    if instance.name in ADULT_CATEGORIES:
+        instance._adult_item_pks = list(instance.item_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def update_adult_flag_on_category_deleted(sender, instance, **kwargs):
+    pks = instance.__dict__.pop('_adult_item_pks', None)
+    if pks:
+        Item.objects.update_adult_flag(pks)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Magazine)
+@receiver(post_save, sender=Figure)
+def update_search_vector_on_item_saved(sender, instance, **kwargs):
+    Item.objects.update_search_vector([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+def update_item_on_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = get_m2m_changed_items(instance, action, reverse, pk_set, 'book_set')
+    if pks is None:
+        return
+
+    Item.objects.update_search_vector(pks)
+
+
+@receiver(post_save, sender=Author)
+def update_search_vector_on_author_saved(sender, instance, created, **kwargs):
+    if not created:
+        Item.objects.update_search_vector(Book.objects.filter(author=instance).values('pk'))
+
+
+@receiver(pre_delete, sender=Author)
+def collect_books_of_author(sender, instance, **kwargs):
+    instance._book_pks = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def update_search_vector_on_author_deleted(sender, instance, **kwargs):
+    pks = instance.__dict__.pop('_book_pks', None)
+    if pks:
+        Item.objects.update_search_vector(pks)
+
+
+@receiver(post_save, sender=Publisher)
+def update_search_vector_on_publisher_saved(sender, instance, created, **kwargs):
+    if not created:
+        Item.objects.update_search_vector(Book.objects.filter(publisher=instance).values('pk'))
+
+
+@receiver(post_save, sender=Brand)
+def update_search_vector_on_brand_saved(sender, instance, created, **kwargs):
+    if not created:
+        Item.objects.update_search_vector(Figure.objects.filter(brand=instance).values('pk'))
+
+
+def bump_generation_on_saved(sender, instance, **kwargs):
+    bump_generation(sender)
+
+
+def bump_generation_on_m2m_changed(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(instance.__class__, model)
+
+
+# Обработчики подключаются только к моделям каталога, чтобы не вызываться при сохранении
+# остальных моделей проекта и не отключать быстрое удаление (fast delete) их строк
+for catalog_model in apps.get_app_config('items').get_models():
+    post_save.connect(bump_generation_on_saved, sender=catalog_model)
+    post_delete.connect(bump_generation_on_saved, sender=catalog_model)
+    for field in catalog_model._meta.local_many_to_many:
+        m2m_changed.connect(bump_generation_on_m2m_changed, sender=field.remote_field.through)
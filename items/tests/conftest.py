@@ -1,11 +1,17 @@
 import pytest
 from random import randint
 from django.conf import settings
+from django.core.cache import caches
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.models import CustomUser
-from items.models import Book, Author, Genre, Language, Publisher, Category, Brand
+from items.models import Book, Author, Genre, Language, Publisher, Category, Brand, Magazine, Figure
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    caches[settings.CATALOG_CACHE_ALIAS].clear()
 
 
 @pytest.fixture
@@ -135,3 +141,35 @@ def book_factory(db, language_factory, publisher_factory):
     return create_books
 
 
+@pytest.fixture
+def magazine_factory(db):
+    def create_magazines(quantity: int = 1):
+        language, _ = Language.objects.get_or_create(code='MG', name='Magazine language')
+        magazines = []
+        for i in range(quantity):
+            magazines.append(Magazine.objects.create(
+                    title=f'Magazine {i}',
+                    price=randint(100, 5000),
+                    number=i,
+                    language=language,
+                    slug=f'magazine-{i}'
+            ))
+        return magazines
+    return create_magazines
+
+
+@pytest.fixture
+def figure_factory(db):
+    def create_figures(quantity: int = 1):
+        brand, _ = Brand.objects.get_or_create(name='Figure brand')
+        figures = []
+        for i in range(quantity):
+            figures.append(Figure.objects.create(
+                    title=f'Figure {i}',
+                    price=randint(100, 5000),
+                    character=f'Character {i}',
+                    brand=brand,
+                    slug=f'figure-{i}'
+            ))
+        return figures
+    return create_figures
@@ -0,0 +1,149 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from items.models import Book, Figure, Item
+
+
+@pytest.mark.django_db
+class TestBatchBookViewSet:
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, access_token_admin, language_factory, publisher_factory, author_factory,
+                genre_factory, category_factory):
+        self.client = api_client()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_admin}')
+        self.language = language_factory(1)[0]
+        self.publisher = publisher_factory(1)[0]
+        self.authors = author_factory(3)
+        self.genres = genre_factory(2)
+        self.categories = category_factory(2)
+
+    def get_book_data(self, i: int) -> dict:
+        return {
+            'title': f'Batch {i}',
+            'price': 100 + i,
+            'year': '2000-01-01',
+            'language': self.language.id,
+            'publisher': self.publisher.id,
+            'author': [self.authors[i % 3].id, self.authors[(i + 1) % 3].id],
+            'genre': [self.genres[i % 2].id],
+            'categories': [self.categories[0].id],
+            'slug': f'batch-{i}',
+        }
+
+    def post_books(self, quantity: int):
+        data = [self.get_book_data(i) for i in range(quantity)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('items:book-list'), data, format='json')
+        return response, len(context.captured_queries)
+
+    def test_create_books(self):
+        response, _ = self.post_books(3)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [book['slug'] for book in response.data] == ['batch-0', 'batch-1', 'batch-2']
+        assert sorted(response.data[1]['author']) == sorted([self.authors[1].id, self.authors[2].id])
+        book = Book.objects.get(slug='batch-1')
+        assert book.item_type == 'book'
+        assert book.title_translit == 'batch-1'
+        assert sorted(book.author.values_list('pk', flat=True)) == sorted(response.data[1]['author'])
+        assert list(book.categories.all()) == [self.categories[0]]
+        assert Item.objects.filter(search_vector__isnull=False).count() == 3
+
+    def test_create_books_constant_queries(self):
+        _, queries_small = self.post_books(2)
+        Item.objects.all().delete()
+        _, queries_large = self.post_books(20)
+
+        assert queries_small == queries_large
+
+    def test_create_books_errors_per_item(self):
+        data = [self.get_book_data(i) for i in range(4)]
+        data[1]['author'] = [999999]
+        data[2]['slug'] = data[0]['slug']
+        del data[3]['price']
+
+        response = self.client.post(reverse('items:book-list'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert 'author' in response.data[1]
+        assert 'slug' in response.data[2]
+        assert 'price' in response.data[3]
+        assert not Book.objects.exists()
+
+    def test_create_existing_slug(self):
+        Item.objects.create(title='Other', price=1, slug='title-0')
+        data = self.get_book_data(0)
+        data['slug'] = 'title-0'
+
+        response = self.client.post(reverse('items:book-list'), [data], format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'slug' in response.data[0]
+
+    def test_create_adult_books(self, adult_category):
+        data = self.get_book_data(0)
+        data['categories'] = [adult_category.id]
+
+        response = self.client.post(reverse('items:book-list'), [data], format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert 'is_adult' not in response.data[0]
+        assert Item.objects.get(slug='batch-0').is_adult
+
+    def test_update_books(self):
+        self.post_books(2)
+        books = list(Book.objects.order_by('pk'))
+        data = [
+            {'id': books[0].id, 'title': 'Changed', 'author': [self.authors[2].id]},
+            {'id': books[1].id, 'price': 1, 'slug': books[1].slug},
+        ]
+
+        response = self.client.patch(reverse('items:book-batch'), data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        books[0].refresh_from_db()
+        books[1].refresh_from_db()
+        assert books[0].title == 'Changed'
+        assert books[0].title_translit == 'changed'
+        assert list(books[0].author.all()) == [self.authors[2]]
+        assert books[1].price == 1
+        assert books[1].author.count() == 2
+        assert response.data[0]['author'] == [self.authors[2].id]
+
+    def test_update_unknown_book(self):
+        self.post_books(1)
+        data = [{'id': Book.objects.get().id, 'price': 1}, {'id': 999999, 'price': 1}]
+
+        response = self.client.patch(reverse('items:book-batch'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert 'id' in response.data[1]
+        assert Book.objects.get().price == 100
+
+    def test_single_create_still_supported(self):
+        response = self.client.post(reverse('items:book-list'), self.get_book_data(0), format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['slug'] == 'batch-0'
+
+
+@pytest.mark.django_db
+def test_create_figures(api_client, access_token_admin, brand_factory, category_factory):
+    brand = brand_factory(1)[0]
+    category = category_factory(1)[0]
+    client = api_client()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_admin}')
+    data = [
+        {'title': f'Figure {i}', 'price': 10, 'brand': brand.id, 'slug': f'figure-{i}', 'categories': [category.id]}
+        for i in range(2)
+    ]
+
+    response = client.post(reverse('items:figure-list'), data, format='json')
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Figure.objects.filter(categories=category).count() == 2
@@ -0,0 +1,126 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from items.models import Author, Book, Item, Publisher
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    def write(name: str, content: str):
+        path = tmp_path / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+    return write
+
+
+def import_catalog(path: str, **options) -> str:
+    out, err = StringIO(), StringIO()
+    call_command('import_catalog', path, stdout=out, stderr=err, **options)
+    return out.getvalue() + err.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportCatalog:
+
+    def test_import_jsonl(self, write_file):
+        Author.objects.create(name='Лев Толстой')
+        rows = [
+            {'title': 'Война и мир', 'price': 500, 'year': 1869, 'language': 'Русский', 'publisher': 'АСТ',
+             'authors': ['Лев Толстой'], 'genres': ['Роман'], 'categories': ['Классика']},
+            {'title': 'Анна Каренина', 'price': 400, 'year': '1877-01-01', 'language': 'Русский', 'publisher': 'АСТ',
+             'authors': ['Лев Толстой', 'Новый автор'], 'genres': ['Роман']},
+        ]
+        path = write_file('books.jsonl', '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows))
+
+        output = import_catalog(path)
+
+        assert 'Imported 2 books' in output
+        book = Book.objects.get(title='Война и мир')
+        assert book.slug == 'vojna-i-mir'
+        assert book.item_type == 'book'
+        assert book.title_translit == 'vojna-i-mir'
+        assert book.publisher.name == 'АСТ'
+        assert [category.name for category in book.categories.all()] == ['Классика']
+        assert Author.objects.filter(name='Лев Толстой').count() == 1
+        assert sorted(Book.objects.get(title='Анна Каренина').author.values_list('name', flat=True)) == \
+            ['Лев Толстой', 'Новый автор']
+        assert Publisher.objects.count() == 1
+        assert Item.objects.filter(search_vector__isnull=False).count() == 2
+
+    def test_import_csv(self, write_file):
+        path = write_file('books.csv', 'title,price,year,language,publisher,authors,genres\n'
+                                       'Book,100,2000,English,Publisher,A|B,Novel\n')
+
+        assert 'Imported 1 books' in import_catalog(path)
+        assert sorted(Book.objects.get().author.values_list('name', flat=True)) == ['A', 'B']
+
+    def test_slug_collisions(self, write_file, book_factory):
+        book_factory(1)
+        Item.objects.create(title='Other', price=1, slug='title-0-2')
+        rows = [{'title': 'Title 0', 'price': 1, 'year': 2000, 'language': 'RU', 'publisher': 'P'}] * 3
+        path = write_file('books.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        import_catalog(path, batch_size=2)
+
+        assert sorted(Book.objects.filter(title='Title 0').values_list('slug', flat=True)) == \
+            ['title-0', 'title-0-3', 'title-0-4', 'title-0-5']
+
+    def test_adult_flag(self, write_file):
+        row = {'title': 'Adult', 'price': 1, 'year': 2000, 'language': 'RU', 'publisher': 'P',
+               'categories': [settings.ADULT_CATEGORIES[0]]}
+        path = write_file('books.jsonl', json.dumps(row))
+
+        import_catalog(path)
+
+        assert Item.objects.get(title='Adult').is_adult
+
+    def test_errors(self, write_file):
+        rows = [
+            {'title': '', 'price': 1, 'year': 2000, 'language': 'RU', 'publisher': 'P'},
+            {'title': 'Book', 'price': 'abc', 'year': 2000, 'language': 'RU', 'publisher': 'P'},
+            {'title': 'Book', 'price': 1, 'year': 2000, 'language': 'RU', 'publisher': 'P'},
+        ]
+        path = write_file('books.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        output = import_catalog(path)
+
+        assert 'Imported 1 books' in output
+        assert 'errors: 2' in output
+        assert 'Line 2' in output
+
+    def test_database_constraints(self, write_file):
+        valid = {'title': 'Book', 'price': 1, 'year': 2000, 'language': 'RU', 'publisher': 'P'}
+        rows = [
+            {**valid, 'title': 'T' * 71},
+            {**valid, 'price': -1},
+            {**valid, 'count_available': 70000},
+            {**valid, 'authors': ['A' * 51]},
+            valid,
+        ]
+        lines = [json.dumps(row) for row in rows]
+        lines.insert(2, '{"title": "Broken"')
+        path = write_file('books.jsonl', '\n'.join(lines))
+
+        output = import_catalog(path)
+
+        assert 'Imported 1 books' in output
+        assert 'errors: 5' in output
+        for line in range(1, 6):
+            assert f'Line {line}:' in output
+        assert 'invalid JSON' in output
+
+    def test_invalid_csv(self, write_file):
+        description = 'D' * (csv.field_size_limit() + 1)
+        path = write_file('books.csv', 'title,price,year,language,publisher,description\n'
+                                       f'Book,1,2000,RU,P,{description}\n'
+                                       'Book,1,2000,RU,P,\n')
+
+        output = import_catalog(path)
+
+        assert 'Imported 1 books' in output
+        assert 'Line 1: invalid CSV' in output
@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import uuid
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+
+from items.models import Item
+from utils import renderers
+from utils.renderers import FastJSONParser, FastJSONRenderer
+
+DATA = {
+    'id': 1,
+    'title': 'Война и мир ',
+    'price': decimal.Decimal('10.50'),
+    'lazy': _('title'),
+    'date': datetime.date(2020, 1, 2),
+    'naive': datetime.datetime(2020, 1, 2, 3, 4, 5, 123456),
+    'aware': datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+    'offset': datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=3))),
+    'uuid': uuid.UUID(int=1),
+    'duration': datetime.timedelta(hours=1),
+    'nested': [{'id': 2, 'name': None, 'flag': True}],
+    3: 'non-string key',
+}
+
+
+@pytest.fixture(params=['orjson', 'fallback'])
+def accelerator(request, monkeypatch):
+    if request.param == 'fallback':
+        monkeypatch.setattr(renderers, 'orjson', None)
+    return request.param
+
+
+def test_render_same_as_default(accelerator):
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+def test_render_indent(accelerator):
+    media_type = 'application/json; indent=4'
+
+    assert FastJSONRenderer().render(DATA, media_type) == JSONRenderer().render(DATA, media_type)
+
+
+def test_render_image_url(accelerator):
+    field = Item._meta.get_field('photo')
+    data = {'photo': FieldFile(None, field, 'items/photo/1.jpg'), 'empty': FieldFile(None, field, '')}
+
+    assert FastJSONRenderer().render(data) == b'{"photo":"/media/items/photo/1.jpg","empty":null}'
+
+
+def test_render_none():
+    assert FastJSONRenderer().render(None) == b''
+
+
+def test_parse(accelerator):
+    content = '{"title": "Война и мир", "price": 10, "items": [1, 2]}'.encode()
+
+    assert FastJSONParser().parse(BytesIO(content)) == JSONParser().parse(BytesIO(content))
+
+
+def test_parse_error(accelerator):
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(BytesIO(b'{"title": '))
+
+
+@pytest.mark.django_db
+def test_api_response(api_client, book_factory):
+    book_factory(1)
+    response = api_client().get(reverse('items:book-list'))
+
+    assert response['Content-Type'] == 'application/json'
+    assert response.content == JSONRenderer().render(response.data)
+
+
+def test_benchmark_command():
+    out = StringIO()
+    call_command('benchmark_renderers', count=100, repeat=1, stdout=out)
+
+    assert 'Speedup' in out.getvalue()
+
+
+def test_timezone_now_rendered(accelerator):
+    now = timezone.now()
+
+    assert FastJSONRenderer().render({'now': now}) == JSONRenderer().render({'now': now})
@@ -1,9 +1,28 @@
+import csv
+import json
+from base64 import b64encode
+from io import StringIO
 from random import randint
+from urllib.parse import urlencode
 
 import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 
+from accounts.models import CustomUser
+from items.filters import ItemFilter
+from items.models import Book, Figure, Item, Magazine
+from items.serializers import (GetBookSerializer, GetFigureSerializer,
+                               GetMagazineSerializer, ItemSerializer)
+from items.views import ItemExportView
+from utils.values_serializer import ValuesSerializer
+
 
 class TestBookViewSet:
     @pytest.fixture(autouse=True)
@@ -44,7 +63,20 @@ class TestBookViewSet:
         url = reverse('items:book-list')
         response = self.client.get(url)
 
-        assert len(response.data) == 5
+        assert len(response.data['results']) == 5
+
+    def test_get_list_books_constant_queries(self, django_assert_num_queries):
+        url = reverse('items:book-list')
+        for book in self.books:
+            book.author.add(*self.authors)
+            book.genre.add(*self.genres)
+
+        # books with language and publisher + categories + authors + genres
+        with django_assert_num_queries(4):
+            response = self.client.get(url)
+
+        assert len(response.data['results'][0]['author']) == 5
+        assert response.data['results'][0]['publisher']['name'] == self.books[0].publisher.name
 
     @pytest.mark.parametrize('token, expected_status, quantity', [
         (pytest.lazy_fixture('access_token_admin'), status.HTTP_200_OK, 5),
@@ -60,7 +92,7 @@ class TestBookViewSet:
         response = self.client.get(url)
 
         assert response.status_code == expected_status
-        assert len(response.data) == quantity
+        assert len(response.data['results']) == quantity
 
     def test_get_book(self):
         url = reverse('items:book-detail', kwargs={'pk': self.books[0].pk})
@@ -94,7 +126,612 @@ class TestBookViewSet:
         response = self.client.get(url, data={'categories__name': categories[0]})
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.json()) == 3
+        assert len(response.json()['results']) == 3
+
+
+class TestItemViewSet:
+    url_list = reverse('items:item-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, magazine_factory, figure_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.magazines = magazine_factory(2)
+        self.figures = figure_factory(1)
+
+    def test_list_items_type(self):
+        response = self.client.get(self.url_list)
+
+        assert response.status_code == status.HTTP_200_OK
+        types = [item['type'] for item in response.data['results']]
+        assert types.count('book') == 3
+        assert types.count('magazine') == 2
+        assert types.count('figure') == 1
+
+    def test_list_items_constant_queries(self, django_assert_num_queries):
+        # items + categories
+        with django_assert_num_queries(2):
+            self.client.get(self.url_list)
+
+        for i in range(10):
+            Book.objects.create(
+                title=f'Extra {i}',
+                price=randint(100, 5000),
+                year='2000-01-01',
+                language=self.books[0].language,
+                publisher=self.books[0].publisher,
+                slug=f'extra-{i}'
+            )
+        with django_assert_num_queries(2):
+            self.client.get(self.url_list)
+
+    @pytest.mark.parametrize('ordering', ['id', '-id', 'price', '-price', 'title'])
+    def test_list_items_cursor_pagination(self, ordering):
+        tiebreaker = '-id' if ordering.startswith('-') else 'id'
+        expected = list(Item.objects.order_by(ordering, tiebreaker).values_list('pk', flat=True))
+
+        response = self.client.get(self.url_list, data={'ordering': ordering, 'page_size': 4})
+        first_page = response.data['results']
+        response = self.client.get(response.data['next'])
+        second_page = response.data['results']
+
+        assert [item['id'] for item in first_page + second_page] == expected
+        assert response.data['next'] is None
+
+        response = self.client.get(response.data['previous'])
+
+        assert response.data['results'] == first_page
+
+    @pytest.mark.parametrize('ordering', ['price', '-price', 'price,-title'])
+    def test_list_items_cursor_pagination_equal_values(self, ordering):
+        for i in range(12):
+            Book.objects.create(
+                title=f'Same price {i % 3}',
+                price=777,
+                year='2000-01-01',
+                language=self.books[0].language,
+                publisher=self.books[0].publisher,
+                slug=f'same-price-{i}'
+            )
+        fields = ordering.split(',')
+        tiebreaker = '-id' if fields[0].startswith('-') else 'id'
+        expected = list(Item.objects.order_by(*fields, tiebreaker).values_list('pk', flat=True))
+
+        ids, pages = [], []
+        response = self.client.get(self.url_list, data={'ordering': ordering, 'page_size': 5})
+        while True:
+            ids += [item['id'] for item in response.data['results']]
+            pages.append(response.data['results'])
+            if response.data['next'] is None:
+                break
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(response.data['next'])
+            assert not any('OFFSET' in query['sql'] for query in context.captured_queries)
+
+        assert ids == expected
+        response = self.client.get(response.data['previous'])
+        assert response.data['results'] == pages[-2]
+
+    def test_list_items_cursor_row_comparison(self):
+        response = self.client.get(self.url_list, data={'ordering': 'price', 'page_size': 2})
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(response.data['next'])
+
+        assert '("items_item"."price", "items_item"."id") > (' in context.captured_queries[0]['sql']
+
+    @pytest.mark.parametrize('position', ['["abc", "1"]', '[["1"], "1"]', '["1"]', 'not json'])
+    def test_list_items_invalid_cursor(self, position):
+        cursor = b64encode(urlencode({'p': position}).encode('ascii')).decode('ascii')
+        response = self.client.get(self.url_list, data={'ordering': 'price', 'cursor': cursor})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_items_pagination_with_filters(self):
+        response = self.client.get(self.url_list, data={'search': 'Title', 'min_price': 0, 'page_size': 2})
+
+        assert len(response.data['results']) == 2
+        response = self.client.get(response.data['next'])
+        assert len(response.data['results']) == 1
+
+    def test_list_items_expand_details(self):
+        response = self.client.get(self.url_list, data={'expand': 'details'})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = {item['id']: item for item in response.data['results']}
+        book = data[self.books[0].pk]
+        assert book['type'] == 'book'
+        assert book['publisher']['id'] == self.books[0].publisher_id
+        assert 'author' in book and 'genre' in book
+        assert data[self.magazines[0].pk]['number'] == self.magazines[0].number
+        assert data[self.figures[0].pk]['brand']['name'] == self.figures[0].brand.name
+
+    def test_list_items_expand_details_constant_queries(self, django_assert_num_queries):
+        # items + books (categories, author, genre) + magazines (categories) + figures (categories)
+        with django_assert_num_queries(9):
+            self.client.get(self.url_list, data={'expand': 'details'})
+
+        for i in range(10):
+            Book.objects.create(
+                title=f'Extra {i}',
+                price=randint(100, 5000),
+                year='2000-01-01',
+                language=self.books[0].language,
+                publisher=self.books[0].publisher,
+                slug=f'extra-{i}'
+            )
+        with django_assert_num_queries(9):
+            self.client.get(self.url_list, data={'expand': 'details'})
+
+    def test_retrieve_item_expand_details(self):
+        url = reverse('items:item-detail', kwargs={'pk': self.books[0].pk})
+        response = self.client.get(url, data={'expand': 'details'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['type'] == 'book'
+        assert response.data['language']['id'] == self.books[0].language_id
+
+    @pytest.mark.parametrize('basename, items', [('book', 'books'), ('magazine', 'magazines'), ('figure', 'figures')])
+    def test_internal_fields_hidden(self, basename, items):
+        pk = getattr(self, items)[0].pk
+        detail = self.client.get(reverse(f'items:{basename}-detail', kwargs={'pk': pk})).data
+        listed = self.client.get(reverse(f'items:{basename}-list')).data['results'][0]
+        expanded = self.client.get(reverse('items:item-detail', kwargs={'pk': pk}), data={'expand': 'details'}).data
+
+        for data in (detail, listed, expanded):
+            assert 'is_adult' not in data and 'item_type' not in data
+        assert expanded['type'] == basename
+
+    def test_retrieve_item_type(self):
+        url = reverse('items:item-detail', kwargs={'pk': self.figures[0].pk})
+        response = self.client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['type'] == 'figure'
+
+
+class TestAdultFlag:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, book_factory, category_factory, adult_category):
+        self.books = book_factory(3)
+        self.categories = category_factory(2)
+        self.adult_category = adult_category
+
+    def test_add_adult_category(self):
+        self.books[0].categories.add(self.adult_category, self.categories[0])
+
+        assert self.books[0].is_adult
+        assert list(Item.objects.filter(is_adult=True)) == [self.books[0].item_ptr]
+
+        self.books[0].categories.remove(self.adult_category)
+
+        assert not self.books[0].is_adult
+        assert not Item.objects.filter(is_adult=True).exists()
+
+    def test_add_items_to_adult_category(self):
+        self.adult_category.item_set.add(self.books[0], self.books[1])
+
+        assert Item.objects.filter(is_adult=True).count() == 2
+
+        self.adult_category.item_set.clear()
+
+        assert not Item.objects.filter(is_adult=True).exists()
+
+    def test_rename_category(self):
+        self.categories[0].item_set.add(self.books[0])
+        self.categories[0].name = self.adult_category.name
+        self.adult_category.delete()
+
+        assert not Item.objects.filter(is_adult=True).exists()
+
+        self.categories[0].save()
+
+        assert list(Item.objects.filter(is_adult=True).values_list('pk', flat=True)) == [self.books[0].pk]
+
+    def test_delete_adult_category(self):
+        self.books[0].categories.add(self.adult_category)
+        self.adult_category.delete()
+
+        assert not Item.objects.filter(is_adult=True).exists()
+
+    def test_rebuild_adult_flags_command(self):
+        self.books[0].categories.add(self.adult_category)
+        Item.objects.update(is_adult=False)
+
+        call_command('rebuild_adult_flags', stdout=StringIO())
+
+        assert list(Item.objects.filter(is_adult=True).values_list('pk', flat=True)) == [self.books[0].pk]
+
+
+class TestFullTextSearch:
+    url_list = reverse('items:item-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, author_factory, figure_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.authors = author_factory(2)
+        self.figures = figure_factory(1)
+
+    def search(self, value, url=None):
+        response = self.client.get(url or self.url_list, data={'search': value})
+        assert response.status_code == status.HTTP_200_OK
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_russian_title(self):
+        self.books[0].title = 'Война и мир'
+        self.books[0].save()
+
+        assert self.search('войны') == [self.books[0].pk]
+
+    def test_search_english_description(self):
+        self.books[1].description = 'A story about running horses'
+        self.books[1].save()
+
+        assert self.search('horse run') == [self.books[1].pk]
+
+    def test_search_author_and_publisher(self):
+        self.authors[0].name = 'Лев Толстой'
+        self.authors[0].save()
+        self.books[2].author.add(self.authors[0])
+
+        assert self.search('Толстой') == [self.books[2].pk]
+
+        self.authors[0].name = 'Фёдор Достоевский'
+        self.authors[0].save()
+
+        assert self.search('Толстой') == []
+        assert self.books[2].pk in self.search(self.books[2].publisher.name)
+
+    def test_search_brand(self):
+        url = reverse('items:figure-list')
+
+        assert self.search(self.figures[0].brand.name, url) == [self.figures[0].pk]
+
+    def test_search_ordered_by_rank(self):
+        self.books[0].description = 'dragon'
+        self.books[0].save()
+        self.books[1].title = 'Dragon'
+        self.books[1].save()
+
+        assert self.search('dragon') == [self.books[1].pk, self.books[0].pk]
+
+        response = self.client.get(self.url_list, data={'search': 'dragon', 'page_size': 1})
+        first_page = response.data['results']
+        response = self.client.get(response.data['next'])
+
+        assert [item['id'] for item in first_page + response.data['results']] == [self.books[1].pk, self.books[0].pk]
+
+    def test_search_with_ordering(self):
+        expected = sorted(self.books, key=lambda book: (book.price, book.pk))
+        response = self.client.get(self.url_list, data={'search': 'title', 'ordering': 'price'})
+
+        assert [item['id'] for item in response.data['results']] == [book.pk for book in expected]
+
+
+class TestFuzzySearch:
+    url_list = reverse('items:item-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.books[0].title = 'Война и мир'
+        self.books[0].save()
+        self.books[1].title = 'Мир животных'
+        self.books[1].save()
+
+    def search(self, value, mode='fuzzy'):
+        response = self.client.get(self.url_list, data={'search': value, 'search_mode': mode})
+        assert response.status_code == status.HTTP_200_OK
+        return [item['id'] for item in response.data['results']]
+
+    def test_translit_title_stored(self):
+        self.books[0].refresh_from_db()
+
+        assert self.books[0].title_translit == 'vojna-i-mir'
+
+    @pytest.mark.parametrize('value', ['vojna i mir', 'voyna i mir', 'Вона и мир', 'ВОЙНА И МИР'])
+    def test_fuzzy_search(self, value):
+        assert self.search(value)[0] == self.books[0].pk
+
+    def test_fuzzy_search_ordered_by_similarity(self):
+        self.books[2].title = 'Мир животных и птиц'
+        self.books[2].save()
+
+        assert self.search('mir zhivotnikh') == [self.books[1].pk, self.books[2].pk]
+
+    def test_fulltext_mode_ignores_translit(self):
+        assert self.search('vojna', mode='fulltext') == []
+
+
+class TestResponseCache:
+    url_list = reverse('items:book-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, category_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.categories = category_factory(1)
+
+    def test_cached_list(self, django_assert_num_queries):
+        response = self.client.get(self.url_list)
+
+        with django_assert_num_queries(0):
+            cached_response = self.client.get(self.url_list)
+
+        assert cached_response.data == response.data
+
+    def test_query_string_normalized(self, django_assert_num_queries):
+        self.client.get(self.url_list, data={'ordering': 'price', 'page_size': 2})
+
+        with django_assert_num_queries(0):
+            self.client.get(f'{self.url_list}?page_size=2&ordering=price')
+
+    def test_invalidate_on_save(self):
+        self.client.get(self.url_list)
+        self.books[0].title = 'New title'
+        self.books[0].save()
+
+        response = self.client.get(self.url_list)
+
+        assert response.data['results'][0]['title'] == 'New title'
+
+    def test_invalidate_on_m2m_changed(self):
+        url = reverse('items:book-detail', kwargs={'pk': self.books[0].pk})
+        self.client.get(url)
+        self.books[0].categories.add(self.categories[0])
+
+        response = self.client.get(url)
+
+        assert response.data['categories'][0]['id'] == self.categories[0].pk
+
+    def test_invalidate_on_related_saved(self):
+        self.client.get(self.url_list)
+        publisher = self.books[0].publisher
+        publisher.name = 'New publisher'
+        publisher.save()
+
+        response = self.client.get(self.url_list)
+
+        assert response.data['results'][0]['publisher']['name'] == 'New publisher'
+
+    def test_cache_by_user_class(self, adult_category, access_token_adult_user):
+        self.books[0].categories.add(adult_category)
+        response = self.client.get(self.url_list)
+
+        assert len(response.data['results']) == 2
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_adult_user}')
+        response = self.client.get(self.url_list)
+
+        assert len(response.data['results']) == 3
+
+    def test_receivers_limited_to_catalog(self):
+        assert post_save.has_listeners(Book) and post_delete.has_listeners(Item)
+        assert not post_delete.has_listeners(CustomUser)
+
+
+class TestConditionalResponse:
+    url_list = reverse('items:book-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, category_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.categories = category_factory(1)
+
+    def test_validators_in_response(self):
+        response = self.client.get(self.url_list)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'].startswith('"')
+        assert 'Last-Modified' in response
+        assert 'Authorization' in response['Vary'] and 'Cookie' in response['Vary']
+
+    @pytest.mark.parametrize('url', [
+        reverse('items:book-list'),
+        reverse('items:item-list'),
+        reverse('items:magazine-list'),
+        reverse('items:figure-list'),
+        reverse('items:author-list'),
+    ])
+    def test_if_none_match(self, url, django_assert_num_queries):
+        etag = self.client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url_list)['Last-Modified']
+
+        response = self.client.get(self.url_list, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_detail(self):
+        url = reverse('items:book-detail', kwargs={'pk': self.books[0].pk})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.parametrize('query', [
+        {'search': 'Title'},
+        {'search': 'Title', 'search_mode': 'fuzzy'},
+        {'min_price': 0},
+        {'ordering': '-price'},
+    ])
+    def test_etag_depends_on_query(self, query):
+        etag = self.client.get(self.url_list)['ETag']
+
+        response = self.client.get(self.url_list, data=query, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert self.client.get(self.url_list, data=query, HTTP_IF_NONE_MATCH=response['ETag']).status_code == \
+            status.HTTP_304_NOT_MODIFIED
+
+    def test_changed_on_save(self):
+        etag = self.client.get(self.url_list)['ETag']
+        self.books[0].title = 'New title'
+        self.books[0].save()
+
+        response = self.client.get(self.url_list, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_changed_on_m2m_changed(self):
+        url = reverse('items:book-detail', kwargs={'pk': self.books[0].pk})
+        etag = self.client.get(url)['ETag']
+        self.categories[0].item_set.add(self.books[0])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['categories'][0]['id'] == self.categories[0].pk
+
+    def test_changed_on_delete(self):
+        etag = self.client.get(self.url_list)['ETag']
+        self.books[1].delete()
+
+        response = self.client.get(self.url_list, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_etag_by_user_class(self, access_token_adult_user):
+        etag = self.client.get(self.url_list)['ETag']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_adult_user}')
+
+        response = self.client.get(self.url_list, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestValuesSerializer:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, magazine_factory, figure_factory, author_factory, genre_factory,
+                category_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        magazine_factory(2)
+        figure_factory(1)
+        authors = author_factory(2)
+        genres = genre_factory(2)
+        categories = category_factory(2)
+        self.books[0].author.add(*authors)
+        self.books[0].genre.add(genres[1])
+        self.books[0].categories.add(*categories)
+        self.books[1].categories.add(categories[1])
+        Item.objects.filter(pk=self.books[0].pk).update(photo='items/photo/cover.jpg')
+
+    @pytest.mark.parametrize('serializer_class', [
+        ItemSerializer, GetBookSerializer, GetFigureSerializer, GetMagazineSerializer
+    ])
+    def test_compiled(self, serializer_class):
+        assert ValuesSerializer.compile(serializer_class) is not None
+
+    @pytest.mark.parametrize('url, model, serializer_class, query', [
+        (reverse('items:item-list'), Item, ItemSerializer, {}),
+        (reverse('items:book-list'), Book, GetBookSerializer, {}),
+        (reverse('items:book-list'), Book, GetBookSerializer, {'ordering': '-price'}),
+        (reverse('items:magazine-list'), Magazine, GetMagazineSerializer, {}),
+        (reverse('items:figure-list'), Figure, GetFigureSerializer, {}),
+    ])
+    def test_same_json(self, url, model, serializer_class, query):
+        response = self.client.get(url, data=query)
+        ordering = query.get('ordering', 'id')
+        queryset = model.objects.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+        expected = serializer_class(queryset, many=True, context={'request': response.wsgi_request}).data
+
+        assert JSONRenderer().render(response.data['results']) == JSONRenderer().render(expected)
+
+    def test_search_pagination(self):
+        response = self.client.get(reverse('items:book-list'), data={'search': 'Title', 'page_size': 2})
+        first_page = response.data['results']
+        response = self.client.get(response.data['next'])
+
+        assert len(first_page) == 2
+        assert len(response.data['results']) == 1
+
+
+class TestItemExport:
+    url = reverse('items:export')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, magazine_factory, figure_factory, author_factory, genre_factory,
+                category_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.magazines = magazine_factory(2)
+        self.figures = figure_factory(1)
+        self.authors = author_factory(2)
+        self.categories = category_factory(1)
+        self.books[0].author.add(*self.authors)
+        self.books[0].genre.add(*genre_factory(1))
+        self.books[0].categories.add(self.categories[0])
+
+    def get_lines(self, **params):
+        response = self.client.get(self.url, data=params)
+        assert response.status_code == status.HTTP_200_OK
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_export_ndjson(self):
+        lines = self.get_lines()
+
+        assert len(lines) == 6
+        book = next(line for line in lines if line['id'] == self.books[0].pk)
+        assert book['type'] == 'book'
+        assert sorted(book['authors']) == [author.name for author in self.authors]
+        assert book['publisher'] == self.books[0].publisher.name
+        assert book['categories'] == [self.categories[0].name]
+        figure = next(line for line in lines if line['type'] == 'figure')
+        assert figure['brand'] == self.figures[0].brand.name
+
+    def test_export_type(self):
+        lines = self.get_lines(type='magazine')
+
+        assert [line['id'] for line in lines] == [magazine.pk for magazine in self.magazines]
+        assert lines[0]['language'] == self.magazines[0].language.name
+
+    def test_export_invalid_type(self):
+        response = self.client.get(self.url, data={'type': 'car'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_csv(self):
+        response = self.client.get(self.url, data={'format': 'csv', 'type': 'book'})
+
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        assert len(rows) == 3
+        assert sorted(rows[0]['authors'].split(', ')) == [author.name for author in self.authors]
+        assert 'brand' not in rows[0]
+
+    def test_export_adult_control(self, adult_category, access_token_adult_user):
+        self.books[1].categories.add(adult_category)
+
+        assert self.books[1].pk not in [line['id'] for line in self.get_lines(type='book')]
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_adult_user}')
+        assert self.books[1].pk in [line['id'] for line in self.get_lines(type='book')]
+
+    def test_export_queries_per_chunk(self, monkeypatch, django_assert_num_queries):
+        monkeypatch.setattr(ItemExportView, 'chunk_size', 2)
+        response = self.client.get(self.url, data={'type': 'book'})
+
+        # 2 chunks: categories, authors, genres, languages, publishers; server-side cursor is declared once
+        with django_assert_num_queries(11):
+            content = b''.join(response.streaming_content)
+
+        assert len(content.splitlines()) == 3
 
 
 class TestCategories:
@@ -117,7 +754,181 @@ class TestCategories:
         response = self.client.get(self.url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == expected_count
+        assert len(response.data['results']) == expected_count
+
+
+class TestFacets:
+    url = reverse('items:facets')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, figure_factory, genre_factory, category_factory, adult_category):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.figures = figure_factory(2)
+        self.genres = genre_factory(2)
+        self.categories = category_factory(2)
+        for i, book in enumerate(self.books):
+            Book.objects.filter(pk=book.pk).update(price=100 * (i + 1) * 4)
+            book.genre.add(self.genres[0])
+            book.categories.add(self.categories[i % 2])
+        Figure.objects.update(price=6000)
+        self.books[0].genre.add(self.genres[1])
+        self.figures[0].categories.add(adult_category)
+
+    def test_facets(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total'] == 4
+        assert response.data['genres'] == [
+            {'id': self.genres[0].id, 'name': self.genres[0].name, 'count': 3},
+            {'id': self.genres[1].id, 'name': self.genres[1].name, 'count': 1},
+        ]
+        assert {row['name']: row['count'] for row in response.data['categories']} == \
+            {self.categories[0].name: 2, self.categories[1].name: 1}
+        assert sum(row['count'] for row in response.data['languages']) == 3
+        assert sum(row['count'] for row in response.data['publishers']) == 3
+        assert response.data['brands'][0]['count'] == 1
+        assert response.data['price'] == [
+            {'min': 0, 'max': 500, 'count': 1},
+            {'min': 500, 'max': 1000, 'count': 1},
+            {'min': 1000, 'max': 2000, 'count': 1},
+            {'min': 5000, 'max': None, 'count': 1},
+        ]
+
+    def test_facets_url(self):
+        assert self.url == '/items/facets/'
+        assert self.client.get('/items/items/facets/').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_facets_adult_user(self, access_token_adult_user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_adult_user}')
+        response = self.client.get(self.url)
+
+        assert response.data['total'] == 5
+        assert settings.ADULT_CATEGORIES[0] in [row['name'] for row in response.data['categories']]
+
+    def test_facets_filtered(self):
+        response = self.client.get(self.url, data={'max_price': 800, 'categories__name': self.categories[0].name})
+
+        assert response.data['total'] == 1
+        assert response.data['price'] == [{'min': 0, 'max': 500, 'count': 1}]
+        assert response.data['brands'] == []
+
+    def test_facets_cached(self, django_assert_num_queries):
+        self.client.get(self.url, data={'max_price': 800})
+
+        with django_assert_num_queries(0):
+            cached_response = self.client.get(self.url, data={'max_price': 800})
+        response = self.client.get(self.url, data={'max_price': 500})
+
+        assert cached_response.data['total'] == 2
+        assert response.data['total'] == 1
+
+
+class TestItemFilter:
+    url = reverse('items:item-list')
+
+    @pytest.fixture(autouse=True)
+    def initial(self, api_client, book_factory, figure_factory, author_factory, genre_factory, category_factory):
+        self.client = api_client()
+        self.books = book_factory(3)
+        self.figures = figure_factory(2)
+        self.authors = author_factory(2)
+        self.genres = genre_factory(2)
+        self.categories = category_factory(3)
+        self.books[0].author.add(*self.authors)
+        self.books[1].author.add(self.authors[1])
+        self.books[0].genre.add(self.genres[0])
+        self.books[0].categories.add(*self.categories[:2])
+        self.books[1].categories.add(self.categories[0])
+        self.figures[0].categories.add(self.categories[1])
+        Book.objects.filter(pk=self.books[0].pk).update(year='1990-05-05', count_available=3)
+        Book.objects.filter(pk__in=[self.books[1].pk, self.books[2].pk]).update(year='2010-01-01')
+
+    def get_ids(self, url=None, **params) -> set:
+        response = self.client.get(url or self.url, data=params)
+        assert response.status_code == status.HTTP_200_OK
+        return {row['id'] for row in response.data['results']}
+
+    def test_filter_author(self):
+        assert self.get_ids(author=self.authors[1].id) == {self.books[0].id, self.books[1].id}
+        assert self.get_ids(author=f'{self.authors[0].id},{self.authors[1].id}') == \
+            {self.books[0].id, self.books[1].id}
+
+    def test_filter_genre(self):
+        assert self.get_ids(genre=self.genres[0].id) == {self.books[0].id}
+
+    def test_filter_categories(self):
+        ids = f'{self.categories[0].id},{self.categories[1].id}'
+
+        assert self.get_ids(categories=ids) == {self.books[0].id, self.books[1].id, self.figures[0].id}
+        assert self.get_ids(categories=ids, categories_mode='all') == {self.books[0].id}
+        assert self.get_ids(categories__name=self.categories[1].name) == {self.books[0].id, self.figures[0].id}
+
+    def test_filter_child_fields(self):
+        book = self.books[0]
+
+        assert self.get_ids(language=book.language_id) == \
+            {b.id for b in self.books if b.language_id == book.language_id}
+        assert self.get_ids(publisher=book.publisher_id) == \
+            {b.id for b in self.books if b.publisher_id == book.publisher_id}
+        assert self.get_ids(brand=self.figures[0].brand_id) == {figure.id for figure in self.figures}
+        assert self.get_ids(reverse('items:book-list'), brand=self.figures[0].brand_id) == set()
+
+    def test_filter_year_and_stock(self):
+        assert self.get_ids(max_year=2000) == {self.books[0].id}
+        assert self.get_ids(min_year=2000, max_year=2010) == {self.books[1].id, self.books[2].id}
+        assert self.get_ids(in_stock=True) == {self.books[0].id}
+        assert self.get_ids(reverse('items:book-list'), in_stock=False) == {self.books[1].id, self.books[2].id}
+
+    @pytest.mark.parametrize('params', [
+        {'min_year': '0'}, {'max_year': '10000'}, {'min_year': '2000.5'}, {'max_year': '1e400'},
+        {'min_year': '9' * 30},
+    ])
+    def test_filter_year_out_of_range(self, params):
+        for url in (self.url, reverse('items:book-list')):
+            response = self.client.get(url, data=params)
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert set(response.data) == set(params)
+
+    def test_filter_year_bounds(self):
+        assert self.get_ids(min_year=1, max_year=9999) == {book.id for book in self.books}
+
+    def test_filter_by_cat_param(self):
+        url = reverse('items:book-list')
+
+        assert self.get_ids(url, cat=str(self.categories[1].id)) == {self.books[0].id}
+        assert self.client.get(url, data={'cat': 'abc'}).status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize('params, index', [
+        ({'categories': '1,2'}, 'items_item_categories_category_id_item_id_idx'),
+        ({'categories': '1,2', 'categories_mode': 'all'}, 'items_item_categories_category_id_item_id_idx'),
+        ({'author': '1'}, 'items_book_author_author_id_book_id_idx'),
+        ({'genre': '1'}, 'items_book_genre_genre_id_book_id_idx'),
+        ({'language': '1'}, 'items_book_language_id_3d710891'),
+        ({'publisher': '1'}, 'items_book_publisher_id_773af2b8'),
+        ({'brand': '1'}, 'items_figure_brand_id_3189cf45'),
+        ({'min_year': '2000'}, 'items_book_year_4a736e_idx'),
+        ({'in_stock': 'true'}, 'items_item_in_stock_idx'),
+        ({'min_price': '100', 'max_price': '500'}, 'items_item_price_bc8058_idx'),
+    ])
+    def test_filter_uses_indexes(self, params, index):
+        queryset = ItemFilter(params, queryset=Item.objects.order_by()).qs
+        with connection.cursor() as cursor:
+            # Остается только bitmap-сканирование, для него нужен индекс под условие фильтра;
+            # на почти пустых таблицах планировщик иначе обходит их по первичному ключу
+            planner_settings = ['enable_seqscan', 'enable_indexscan', 'enable_indexonlyscan']
+            for setting in planner_settings:
+                cursor.execute(f'SET {setting} = off')
+            try:
+                plan = queryset.explain()
+            finally:
+                for setting in planner_settings:
+                    cursor.execute(f'RESET {setting}')
+
+        assert index in plan, plan
 
 
 class TestAuthorViewSet:
@@ -156,7 +967,7 @@ class TestAuthorViewSet:
         response = self.client.get(self.url_list)
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 5
+        assert len(response.data['results']) == 5
 
     def test_retrieve_author(self):
         url = reverse('items:author-detail', kwargs={'pk': self.authors[0].id})
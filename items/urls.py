@@ -4,8 +4,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (AuthorViewSet, BookViewSet, BrandViewSet, CategoryViewSet,
-                    FigureViewSet, GenreViewSet, ItemViewSet, LanguageViewSet,
-                    MagazineViewSet, PublisherViewSet)
+                    FigureViewSet, GenreViewSet, ItemExportView, ItemViewSet,
+                    LanguageViewSet, MagazineViewSet, PublisherViewSet)
 
 app_name = 'items'
 
@@ -22,6 +22,8 @@ router.register(r'magazines', MagazineViewSet, basename='magazine')
 router.register(r'figures', FigureViewSet, basename='figure')
 
 urlpatterns = [
+    path('export/', ItemExportView.as_view(), name='export'),
+    path('facets/', ItemViewSet.as_view({'get': 'facets'}), name='facets'),
     path('', include(router.urls)),
     # path('', views.ItemsListView.as_view(), name='home'),
     # path('category/<str:cat>', views.CategoryListView.as_view(), name='category'),
@@ -1,13 +1,22 @@
 import rest_framework.exceptions
-from django.contrib.contenttypes.models import ContentType
+from django.apps import apps
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, viewsets
-from rest_framework.generics import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import DjangoModelPermissionsOrAnonReadOnly
-
-from items.filters import ItemFilter
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from items.cache import CachedResponseMixin, ConditionalResponseMixin
+from items.export import get_export_columns, iter_export_rows
+from items.facets import get_facets
+from items.filters import (CatalogOrderingFilter, FullTextSearchFilter,
+                           ItemFilter, TrigramSearchFilter,
+                           many_to_many_exists)
 from items.models import (Author, Brand, Category, Genre, Item, Language,
                           Publisher)
+from items.pagination import CatalogCursorPagination
 from items.serializers import (AuthorSerializer, BrandSerializer,
                                CategorySerializer, GenreSerializer,
                                GetBookSerializer, GetFigureSerializer,
@@ -15,98 +24,146 @@ from items.serializers import (AuthorSerializer, BrandSerializer,
                                LanguageSerializer, PostBookSerializer,
                                PostFigureSerializer, PostMagazineSerializer,
                                PublisherSerializer)
+from items.services import get_expanded_items
+from utils.queryset import OptimizeQuerysetMixin
+from utils.renderers import CSVRenderer, NDJSONRenderer
+from utils.values_serializer import ValuesListMixin
 
 
-class LanguageViewSet(viewsets.ModelViewSet):
+class LanguageViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных языков"""
     queryset = Language.objects.all()
     serializer_class = LanguageSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Language]
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных категорий"""
     # queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Category]
 
     def get_queryset(self):
         return Category.objects.adult_control(self.request.user)
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных авторов"""
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Author]
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных жанров"""
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Genre]
 
 
-class PublisherViewSet(viewsets.ModelViewSet):
+class PublisherViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных издателей"""
     queryset = Publisher.objects.all()
     serializer_class = PublisherSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Publisher]
 
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Отображение доступных брендов"""
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogCursorPagination
+    cache_models = [Brand]
 
 
-class ItemViewSet(viewsets.ReadOnlyModelViewSet):
-    """Доступные товары с учетом возрастных ограничений"""
-    serializer_class = ItemSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_class = ItemFilter
-    search_fields = ['title']
-    ordered_fields = ['price']
+# Модели, от которых зависят ответы товаров каталога
+CATALOG_MODELS = [Item, Category, Author, Genre, Language, Publisher, Brand]
 
-    def get_queryset(self):
-        queryset = Item.objects.adult_control(self.request.user).prefetch_related('categories')
-        return queryset
 
-    def get_object(self, queryset=None):
+class ExpandDetailsMixin:
+    """Вывод товаров вместе с полями дочерних моделей по параметру ?expand=details"""
+
+    @property
+    def expand_details(self):
+        return self.request.query_params.get('expand') == 'details'
+
+    def list(self, request, *args, **kwargs):
+        if not self.expand_details:
+            return super().list(request, *args, **kwargs)
+
         queryset = self.filter_queryset(self.get_queryset())
 
-        # Perform the lookup filtering.
-        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(get_expanded_items(page, self.get_serializer_context()))
 
-        assert lookup_url_kwarg in self.kwargs, (
-                'Expected view %s to be called with a URL keyword argument '
-                'named "%s". Fix your URL conf, or set the `.lookup_field` '
-                'attribute on the view correctly.' %
-                (self.__class__.__name__, lookup_url_kwarg)
-        )
+        return Response(get_expanded_items(queryset, self.get_serializer_context()))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.expand_details:
+            return super().retrieve(request, *args, **kwargs)
 
-        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
-        queryset = queryset.select_related(*self.serializer_class.Meta.model.get_children_list())
-        obj = get_object_or_404(queryset, **filter_kwargs)
+        instance = self.get_object()
+        return Response(get_expanded_items([instance], self.get_serializer_context())[0])
 
-        # May raise a permission denied
-        self.check_object_permissions(self.request, obj)
 
-        return obj
+class ItemViewSet(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, ExpandDetailsMixin,
+                  ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """Доступные товары с учетом возрастных ограничений"""
+    serializer_class = ItemSerializer
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, TrigramSearchFilter, CatalogOrderingFilter]
+    filterset_class = ItemFilter
+    ordering_fields = ['id', 'price', 'title']
+    ordering = ['id']
+    pagination_class = CatalogCursorPagination
+    cache_models = CATALOG_MODELS
+
+    def get_queryset(self):
+        return Item.objects.adult_control(self.request.user)
+
+    def facets(self, request, *args, **kwargs):
+        """
+        Количество товаров по значениям фильтров для текущих фильтров и поиска (/items/facets/, см. urls).
+        Ответ кэшируется по сигнатуре запроса (параметры фильтров, класс пользователя).
+        """
+        return self.get_cached_response(self.get_facets_response, request, *args, **kwargs)
 
+    def get_facets_response(self, request, *args, **kwargs):
+        return Response(get_facets(self.filter_queryset(self.get_queryset())))
 
-class ItemChildMixin:
+    def get_optimization_serializer_class(self):
+        if self.action == 'facets':
+            return None
+        if self.expand_details:
+            # Поля дочерних моделей и категории загружаются пакетно в get_expanded_items
+            return None
+        return super().get_optimization_serializer_class()
+
+
+class ItemChildMixin(OptimizeQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, ValuesListMixin):
     """Получение queryset и serializer в соответствии с классом"""
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, TrigramSearchFilter, CatalogOrderingFilter]
     filterset_class = ItemFilter
-    search_fields = ['title']
-    ordered_fields = ['price']
+    ordering_fields = ['id', 'price', 'title']
+    ordering = ['id']
+    pagination_class = CatalogCursorPagination
+    cache_models = CATALOG_MODELS
+    batch_max_size = 1000
 
     def get_queryset(self):
         self.model = self.get_model()
-        queryset = self.model.objects.adult_control(self.request.user).prefetch_related('categories')
+        queryset = self.model.objects.adult_control(self.request.user)
         if self.request.query_params.get('cat'):
             queryset = self.filter_category(queryset, self.request.query_params.get('cat'))
         return queryset
@@ -115,13 +172,37 @@ class ItemChildMixin:
         return self.MAP_ACTION_TO_SERIALIZER.get(self.action, self.serializer_class)
 
     def get_model(self):
-        return ContentType.objects.get(app_label='items', model=self.basename).model_class()
+        return apps.get_model('items', self.basename)
+
+    def create(self, request, *args, **kwargs):
+        """Создание товара или списка товаров (одной транзакцией, ошибки по элементам)"""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.batch_max_size)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['put', 'patch'])
+    def batch(self, request, *args, **kwargs):
+        """Изменение списка товаров, каждый элемент указывает id товара"""
+        if not isinstance(request.data, list):
+            raise rest_framework.exceptions.ValidationError({'non_field_errors': ['Expected a list of items.']})
+        ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+        instances = list(self.get_queryset().filter(pk__in=[pk for pk in ids if str(pk).isdigit()]))
+        serializer = self.get_serializer(
+            instances, data=request.data, many=True, partial=request.method == 'PATCH',
+            max_length=self.batch_max_size
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
 
     @staticmethod
     def filter_category(queryset, category_id):
         """Фильтрация queryset по указанной категории товаров"""
-        if category_id.isdigit() and Category.objects.filter(pk=category_id).exists():
-            return queryset.filter(categories__pk=category_id)
+        if category_id.isdigit():
+            return queryset.filter(many_to_many_exists(Item, 'categories', id=category_id))
         raise rest_framework.exceptions.NotFound()
 
 
@@ -159,3 +240,31 @@ class MagazineViewSet(ItemChildMixin, viewsets.ModelViewSet):
         'create': PostMagazineSerializer,
         'retrieve': GetMagazineSerializer,
     }
+
+
+class ItemExportView(APIView):
+    """
+    Потоковая выгрузка каталога в NDJSON (по умолчанию) или CSV (?format=csv).
+    Типы товаров выбираются параметром type (можно несколько), по умолчанию выгружаются все.
+    """
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        item_types = request.query_params.getlist('type') or Item.get_children_list()
+        if any(item_type not in Item.get_children_list() for item_type in item_types):
+            raise rest_framework.exceptions.ValidationError({'type': f'Choose from {Item.get_children_list()}'})
+
+        rows = iter_export_rows(request.user, item_types, self.chunk_size)
+        renderer = request.accepted_renderer
+        if isinstance(renderer, CSVRenderer):
+            content = renderer.stream(rows, get_export_columns(item_types))
+        else:
+            content = (renderer.render_row(row) for row in rows)
+
+        content_type = renderer.media_type
+        if renderer.charset is not None:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="catalog.{renderer.format}"'
+        return response
@@ -0,0 +1,37 @@
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .models import OutgoingEmail
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = [
+        'recipient',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+    search_fields = [
+        'recipient',
+    ]
+    readonly_fields = [
+        'created_at',
+        'sent_at',
+        'last_error',
+    ]
+    actions = [
+        'retry',
+    ]
+
+    @admin.action(description=_('Retry sending'))
+    def retry(self, request, queryset):
+        queryset.update(status=OutgoingEmail.Statuses.PENDING, attempts=0, next_attempt_at=timezone.now())
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
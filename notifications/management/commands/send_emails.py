@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails over one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails per SMTP connection')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Run as worker, polling the queue every INTERVAL seconds (drain once if 0)')
+
+    def handle(self, *args, **options):
+        while True:
+            while True:
+                sent, failed = send_pending_emails(options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails, failed {failed}'))
+                if sent + failed < options['batch_size']:
+                    break
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,60 @@
+import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди отправки (transactional outbox).
+    Записывается в транзакции изменения данных, отправляется командой send_emails.
+    """
+
+    class Statuses(models.IntegerChoices):
+        PENDING = 0, _('Ожидает отправки')
+        SENT = 1, _('Отправлено')
+        FAILED = 2, _('Не отправлено')
+
+    recipient = models.EmailField(_('recipient'))
+    from_email = models.EmailField(_('from email'), blank=True)
+    subject = models.CharField(_('subject'), max_length=255)
+    # Письмо задается либо текстом body, либо шаблоном с контекстом (рендерится при отправке)
+    body = models.TextField(_('body'), blank=True)
+    template_name = models.CharField(_('template name'), max_length=255, blank=True)
+    context = models.JSONField(_('context'), default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.PositiveSmallIntegerField(_('status'), choices=Statuses.choices, default=Statuses.PENDING)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('next attempt at'), default=timezone.now)
+    last_error = models.TextField(_('last error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    sent_at = models.DateTimeField(_('sent at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('outgoing email')
+        verbose_name_plural = _('outgoing emails')
+        indexes = [
+            # Выборка очереди воркером: только неотправленные письма
+            models.Index(fields=['next_attempt_at'], name='notifications_pending_idx',
+                         condition=models.Q(status=0)),
+        ]
+
+    def __str__(self):
+        return f'[{self.get_status_display()}] {self.recipient}: {self.subject}'
+
+    def mark_sent(self) -> None:
+        self.status = self.Statuses.SENT
+        self.sent_at = timezone.now()
+        self.last_error = ''
+
+    def mark_failed(self, error: Exception) -> None:
+        """Повтор с экспоненциальной задержкой, после EMAIL_OUTBOX_MAX_ATTEMPTS попыток - FAILED"""
+        self.attempts += 1
+        self.last_error = f'{type(error).__name__}: {error}'
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            self.status = self.Statuses.FAILED
+            return
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1)
+        self.next_attempt_at = timezone.now() + datetime.timedelta(seconds=delay)
@@ -0,0 +1,106 @@
+import logging
+
+from django.apps import apps
+from django.core.mail import EmailMessage, get_connection
+from django.db import models, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from notifications.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# Ключ ссылки на объект модели в сохраненном контексте шаблона
+MODEL_REFERENCE_KEY = '__model__'
+
+
+def dump_context(value):
+    """Контекст шаблона в JSON: объекты моделей сохраняются ссылками и перечитываются при отправке"""
+    if isinstance(value, models.Model):
+        return {MODEL_REFERENCE_KEY: value._meta.label_lower, 'pk': value.pk}
+    if isinstance(value, dict):
+        return {str(key): dump_context(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [dump_context(item) for item in value]
+    return value
+
+
+def load_context(value):
+    if isinstance(value, dict):
+        if MODEL_REFERENCE_KEY in value:
+            model = apps.get_model(value[MODEL_REFERENCE_KEY])
+            return model.objects.filter(pk=value['pk']).first()
+        return {key: load_context(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [load_context(item) for item in value]
+    return value
+
+
+def enqueue_email(recipient: str, subject: str, body: str = '', template_name: str = '',
+                  context: dict = None, from_email: str = None) -> OutgoingEmail:
+    """
+    Постановка письма в очередь отправки.
+    Вызывается в транзакции изменения данных: письмо уходит, только если она зафиксирована.
+    """
+    return OutgoingEmail.objects.create(
+        recipient=recipient,
+        from_email=from_email or '',
+        subject=str(subject),
+        body=body,
+        template_name=template_name,
+        context=dump_context(context or {}),
+    )
+
+
+def build_message(email: OutgoingEmail, connection) -> EmailMessage:
+    body = email.body
+    if email.template_name:
+        body = render_to_string(email.template_name, load_context(email.context))
+    return EmailMessage(email.subject, body, email.from_email or None, [email.recipient], connection=connection)
+
+
+def send_pending_emails(batch_size: int = 100) -> tuple[int, int]:
+    """
+    Отправка пачки писем из очереди через одно SMTP-соединение.
+    Письма блокируются с SKIP LOCKED, поэтому несколько воркеров не отправят письмо дважды.
+    Неотправленные письма повторяются с экспоненциальной задержкой.
+    :return: (отправлено, не отправлено)
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.Statuses.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not emails:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:  # noqa: SMTP недоступен - повторяем всю пачку позже
+            logger.error('Не удалось подключиться к почтовому серверу', exc_info=True)
+            for email in emails:
+                email.mark_failed(error)
+            failed = len(emails)
+        else:
+            try:
+                for email in emails:
+                    try:
+                        build_message(email, connection).send()
+                    except Exception as error:  # noqa: Ошибка одного письма не останавливает пачку
+                        logger.error(f'Письмо {email.pk} не было отправлено', exc_info=True)
+                        email.mark_failed(error)
+                        failed += 1
+                    else:
+                        email.mark_sent()
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutgoingEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
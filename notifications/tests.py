@@ -0,0 +1,120 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from items.models import Item
+from notifications.models import OutgoingEmail
+from notifications.services import enqueue_email, send_pending_emails
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(email='buyer@bar.com', password='Qw789456', first_name='Buyer')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+class TestOutbox:
+
+    def test_purchase_queues_email(self, client, user):
+        item = Item.objects.create(title='Item', price=100, count_available=5, slug='item')
+
+        client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 2})
+
+        assert not mail.outbox
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == user.email
+        assert email.template_name == 'services/email_add_to_cart.html'
+        assert email.context['user'] == {'__model__': 'accounts.customuser', 'pk': user.pk}
+
+    def test_rollback_discards_email(self, user):
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                user.email_user('Subject', 'Body')
+                raise ValueError
+
+        assert not OutgoingEmail.objects.exists()
+
+    def test_send_renders_template(self, user):
+        enqueue_email(user.email, 'Activate', template_name='services/email_add_to_cart.html',
+                      context={'user': user, 'data': {'item': 'Book'}, 'current_site': 'store',
+                               'cart_link': 'http://store/cart/'})
+        user.email_user('Hello', 'Plain body')
+
+        assert send_pending_emails() == (2, 0)
+
+        assert [message.subject for message in mail.outbox] == ['Activate', 'Hello']
+        assert 'Buyer' in mail.outbox[0].body and 'http://store/cart/' in mail.outbox[0].body
+        assert mail.outbox[1].body == 'Plain body'
+        assert set(OutgoingEmail.objects.values_list('status', flat=True)) == {OutgoingEmail.Statuses.SENT}
+
+    def test_one_connection_per_batch(self, user):
+        for i in range(3):
+            user.email_user(f'Subject {i}', 'Body')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            send_pending_emails(batch_size=2)
+
+        assert open_connection.call_count == 1
+        assert len(mail.outbox) == 2
+        assert OutgoingEmail.objects.filter(status=OutgoingEmail.Statuses.PENDING).count() == 1
+
+    def test_retry_with_backoff(self, user, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        user.email_user('Broken', 'Body')
+        user.email_user('Fine', 'Body')
+        send = mail.EmailMessage.send
+
+        def fail_broken(message, *args, **kwargs):
+            if message.subject == 'Broken':
+                raise ConnectionError('Server error')
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(mail.EmailMessage, 'send', fail_broken):
+            assert send_pending_emails() == (1, 1)
+            broken = OutgoingEmail.objects.get(subject='Broken')
+            assert broken.status == OutgoingEmail.Statuses.PENDING
+            assert broken.attempts == 1
+            assert broken.next_attempt_at > timezone.now() + datetime.timedelta(seconds=30)
+            assert 'Server error' in broken.last_error
+
+            assert send_pending_emails() == (0, 0)
+            OutgoingEmail.objects.filter(pk=broken.pk).update(next_attempt_at=timezone.now())
+            assert send_pending_emails() == (0, 1)
+
+        broken.refresh_from_db()
+        assert broken.status == OutgoingEmail.Statuses.FAILED
+        assert [message.subject for message in mail.outbox] == ['Fine']
+
+    def test_connection_error(self, user):
+        user.email_user('Subject', 'Body')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError):
+            assert send_pending_emails() == (0, 1)
+
+        assert OutgoingEmail.objects.get().attempts == 1
+
+    def test_command(self, user):
+        for i in range(3):
+            user.email_user(f'Subject {i}', 'Body')
+        out = StringIO()
+
+        call_command('send_emails', batch_size=2, stdout=out)
+
+        assert len(mail.outbox) == 3
+        assert 'Sent 2 emails' in out.getvalue() and 'Sent 1 emails' in out.getvalue()
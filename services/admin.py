@@ -44,7 +44,8 @@ class InvoiceAdmin(admin.ModelAdmin):
     list_display = [
         '__str__',
         'status',
-        'price_total'
+        'price_total',
+        'items_count',
     ]
     list_filter = [
         'status',
@@ -69,6 +70,10 @@ class InvoiceAdmin(admin.ModelAdmin):
         'make_canceled',
     ]
 
+    def get_queryset(self, request):
+        # Итоги хранятся в самом счете, услуги для списка не нужны
+        return super().get_queryset(request).prefetch_related(None)
+
     def formfield_for_choice_field(self, db_field, request, **kwargs):
         if db_field.name == 'status':
             if not request.user.has_perm('can_change_status'):
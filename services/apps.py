@@ -6,3 +6,7 @@ class ServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services'
     verbose_name = _('Services')
+
+    def ready(self):
+        # Implicitly connect a signal handlers decorated with @receiver.
+        from . import signals
@@ -0,0 +1,87 @@
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from services.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def get_request_fingerprint(request) -> str:
+    """Хэш метода, пути и тела запроса"""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.method}|{request.path}|{body}'.encode()).hexdigest()
+
+
+def delete_expired_idempotency_keys(batch_size: int = 1000) -> int:
+    """
+    Удаление сохраненных ответов с истекшим сроком хранения пачками
+    :return: количество удаленных ключей
+    """
+    deleted = 0
+    while True:
+        pks = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
+
+
+class IdempotentMixin:
+    """
+    Поддержка заголовка Idempotency-Key для изменяющих запросов.
+    Ключ и ответ записываются в транзакции самого запроса, поэтому повтор с тем же ключом
+    возвращает сохраненный ответ без повторного выполнения. Параллельный дубликат ждет
+    на уникальном индексе (user, key), пока первый запрос не завершится, и получает его ответ.
+    """
+
+    def get_idempotent_response(self, handler, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = get_request_fingerprint(request)
+        with transaction.atomic():
+            now = timezone.now()
+            IdempotencyKey.objects.filter(user_id=request.user.id, key=key, expires_at__lte=now).delete()
+            record, created = IdempotencyKey.objects.get_or_create(
+                user_id=request.user.id,
+                key=key,
+                defaults={
+                    'fingerprint': fingerprint,
+                    'expires_at': now + datetime.timedelta(hours=settings.IDEMPOTENCY_KEY_TTL),
+                },
+            )
+            if not created:
+                return self.replay_response(record, fingerprint)
+
+            response = handler(request, *args, **kwargs)
+            if status.is_server_error(response.status_code):
+                # Ошибку сервера можно повторить с тем же ключом
+                record.delete()
+            else:
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response'])
+        return response
+
+    @staticmethod
+    def replay_response(record: IdempotencyKey, fingerprint: str) -> Response:
+        if record.fingerprint != fingerprint:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} was used for another request'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = Response(record.response, status=record.status_code)
+        response[REPLAYED_HEADER] = 'true'
+        return response
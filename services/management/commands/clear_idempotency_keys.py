@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from services.idempotency import delete_expired_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete stored responses of idempotent requests whose TTL has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Keys per DELETE')
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_idempotency_keys(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idempotency keys'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from services.models import Invoice
+
+
+class Command(BaseCommand):
+    help = 'Verify or rebuild stored invoice totals (total, items_count) from purchases and rents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Only report invoices with wrong totals')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Invoices per UPDATE')
+
+    def handle(self, *args, **options):
+        mismatched = list(
+            Invoice.objects.with_subtotals()
+            .exclude(total=F('purchase_total') + F('rent_total'), items_count=F('lines_count'))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if options['verify']:
+            for pk in mismatched[:20]:
+                self.stderr.write(f'Invoice {pk} has wrong totals')
+            if mismatched:
+                raise CommandError(f'{len(mismatched)} invoices have wrong totals')
+            self.stdout.write(self.style.SUCCESS('All invoice totals are correct'))
+            return
+
+        batch_size = options['batch_size']
+        for start in range(0, len(mismatched), batch_size):
+            Invoice.objects.filter(pk__in=mismatched[start:start + batch_size]).update_totals()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals of {len(mismatched)} invoices'))
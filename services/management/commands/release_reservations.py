@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Return to stock items whose reservation in unpaid carts has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cart lines per transaction')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Run as worker, sweeping every INTERVAL seconds (once if 0)')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_reservations(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Released {released} cart lines'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
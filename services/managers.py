@@ -1,9 +1,94 @@
+from django.apps import apps
 from django.db import models
-from django.db.models import DurationField, ExpressionWrapper, F
-from django.db.models.functions import ExtractDay
+from django.db.models import (Count, DurationField, ExpressionWrapper, F,
+                              FloatField, OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, ExtractDay, Greatest
+from django.utils import timezone
 
+from drf_store import settings
 
-class InvoiceManager(models.Manager):
+
+def get_purchase_price():
+    """Стоимость покупки"""
+    return F('item__price') * F('quantity')
+
+
+def get_rent_price():
+    """Стоимость аренды: количество * плата за день * количество дней (включительно)"""
+    return F('quantity') * F('daily_payment') * (
+        ExtractDay(ExpressionWrapper(F('date_to') - F('date_from'), output_field=DurationField())) + 1
+    )
+
+
+def get_subtotal(model, price):
+    """Подзапрос суммы стоимости сервисов модели по счету"""
+    subtotal = (
+        model._base_manager
+        .filter(invoice=OuterRef('pk'))
+        .order_by()
+        .values('invoice')
+        .annotate(subtotal=Sum(price))
+        .values('subtotal')
+    )
+    return Coalesce(Subquery(subtotal), 0)
+
+
+def get_lines_count(model):
+    """Подзапрос количества сервисов модели в счете"""
+    count = (
+        model._base_manager
+        .filter(invoice=OuterRef('pk'))
+        .order_by()
+        .values('invoice')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(count), 0)
+
+
+class InvoiceQuerySet(models.QuerySet):
+
+    def open_for(self, user_id):
+        """Корзина (неоплаченный счет) пользователя, поиск по частичному уникальному индексу"""
+        return self.filter(user_id=user_id, status=self.model.InvoiceStatuses.UNPAID.value)
+
+    def with_totals(self):
+        """
+        Суммы счета без обращения к таблицам сервисов:
+        total_price - общая стоимость (хранимое поле total),
+        final_price - стоимость с учетом скидки виртуальной валютой пользователя.
+        """
+        max_discount = F('total_price') * Value(settings.MAX_DISCOUNT, output_field=FloatField())
+        return self.annotate(
+            total_price=F('total'),
+        ).annotate(
+            final_price=F('total_price') - max_discount + Greatest(
+                max_discount - F('user_id__profile__currency'), Value(0, output_field=FloatField())
+            ),
+        )
+
+    def with_subtotals(self):
+        """
+        Суммы счета, вычисленные по таблицам сервисов:
+        purchase_total, rent_total - стоимость покупок и аренды, lines_count - количество сервисов
+        """
+        purchase, rent = apps.get_model('services', 'Purchase'), apps.get_model('services', 'Rent')
+        return self.annotate(
+            purchase_total=get_subtotal(purchase, get_purchase_price()),
+            rent_total=get_subtotal(rent, get_rent_price()),
+            lines_count=get_lines_count(purchase) + get_lines_count(rent),
+        )
+
+    def update_totals(self) -> int:
+        """Пересчет хранимых total и items_count счетов queryset одним UPDATE"""
+        purchase, rent = apps.get_model('services', 'Purchase'), apps.get_model('services', 'Rent')
+        return self.order_by().update(
+            total=get_subtotal(purchase, get_purchase_price()) + get_subtotal(rent, get_rent_price()),
+            items_count=get_lines_count(purchase) + get_lines_count(rent),
+        )
+
+
+class InvoiceManager(models.Manager.from_queryset(InvoiceQuerySet)):
 
     def get_queryset(self):
         qs = (
@@ -14,20 +99,35 @@ class InvoiceManager(models.Manager):
         )
         return qs
 
+    def get_open_invoice(self, user_id):
+        """
+        Корзина пользователя, создается при отсутствии.
+        Один запрос INSERT ... ON CONFLICT по частичному уникальному индексу открытых счетов:
+        параллельные запросы не создадут второй счет, а строка счета блокируется до конца
+        транзакции, поэтому товар не попадет в счет, который в это время оплачивается.
+        """
+        opts = self.model._meta
+        unpaid = self.model.InvoiceStatuses.UNPAID.value
+        column = opts.get_field('user_id').column
+        now = timezone.now()
+        sql = f"""
+            INSERT INTO {opts.db_table} ({column}, status, date_created, status_updated, total, items_count)
+            VALUES (%s, %s, %s, %s, 0, 0)
+            ON CONFLICT ({column}) WHERE status = {unpaid:d} DO UPDATE SET status = EXCLUDED.status
+            RETURNING *
+        """
+        return next(iter(self.prefetch_related(None).raw(sql, [user_id, unpaid, now, now])))
+
 
 class ServiceManager(models.Manager):
 
     def get_queryset(self):
         qs = super(ServiceManager, self).get_queryset().select_related('invoice', 'item')
-        return qs.annotate(price=F('item__price') * F('quantity'))
+        return qs.annotate(price=get_purchase_price())
 
 
 class RentManager(models.Manager):
 
     def get_queryset(self):
         qs = super(RentManager, self).get_queryset().select_related('invoice', 'item')
-        return qs.annotate(
-            price=F('quantity') * F('daily_payment') * (
-                ExtractDay(ExpressionWrapper(F('date_to') - F('date_from'), output_field=DurationField())) + 1
-            )
-        )
+        return qs.annotate(price=get_rent_price())
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:20
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def reserve_unpaid_lines(apps, schema_editor):
+    """Товары уже существующих неоплаченных корзин резервируются на CART_RESERVATION_TTL от момента миграции"""
+    deadline = timezone.now() + datetime.timedelta(minutes=settings.CART_RESERVATION_TTL)
+    for model_name in ('Purchase', 'Rent'):
+        model = apps.get_model('services', model_name)
+        model.objects.filter(invoice__status=1).update(reserved_until=deadline)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_alter_invoice_status_alter_rent_date_to'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='reserved until'),
+        ),
+        migrations.AddField(
+            model_name='rent',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='reserved until'),
+        ),
+        migrations.RunPython(reserve_unpaid_lines, migrations.RunPython.noop),
+    ]
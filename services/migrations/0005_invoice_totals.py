@@ -0,0 +1,38 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+FILL_TOTALS_SQL = """
+UPDATE services_invoice i SET
+    total = COALESCE((
+        SELECT SUM(it.price * p.quantity) FROM services_purchase p JOIN items_item it ON it.id = p.item_id
+        WHERE p.invoice_id = i.id
+    ), 0) + COALESCE((
+        SELECT SUM(r.quantity * r.daily_payment * (r.date_to - r.date_from + 1)) FROM services_rent r
+        WHERE r.invoice_id = i.id
+    ), 0),
+    items_count = (SELECT COUNT(*) FROM services_purchase p WHERE p.invoice_id = i.id)
+        + (SELECT COUNT(*) FROM services_rent r WHERE r.invoice_id = i.id)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_reserved_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='items count'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='total',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='total'),
+        ),
+        migrations.RunSQL(FILL_TOTALS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_invoice_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['user_id', 'status', 'status_updated'], name='services_invoice_history_idx'),
+        ),
+    ]
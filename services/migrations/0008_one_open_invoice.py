@@ -0,0 +1,54 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:37
+
+from django.db import migrations, models
+
+
+# Неоплаченные счета пользователя, кроме первого, с id счета, в который переносятся их сервисы
+EXTRA_OPEN_INVOICES = """
+    SELECT id, keep_id FROM (
+        SELECT id, MIN(id) OVER (PARTITION BY user_id_id) AS keep_id FROM services_invoice WHERE status = 1
+    ) open_invoices WHERE id <> keep_id
+"""
+
+MERGE_OPEN_INVOICES_SQL = [
+    f"""
+    UPDATE services_purchase p SET invoice_id = extra.keep_id
+    FROM ({EXTRA_OPEN_INVOICES}) extra WHERE p.invoice_id = extra.id
+    """,
+    f"""
+    UPDATE services_rent r SET invoice_id = extra.keep_id
+    FROM ({EXTRA_OPEN_INVOICES}) extra WHERE r.invoice_id = extra.id
+    """,
+    f"""
+    DELETE FROM services_invoice i USING ({EXTRA_OPEN_INVOICES}) extra WHERE i.id = extra.id
+    """,
+    """
+    UPDATE services_invoice i SET
+        total = COALESCE((
+            SELECT SUM(it.price * p.quantity) FROM services_purchase p JOIN items_item it ON it.id = p.item_id
+            WHERE p.invoice_id = i.id
+        ), 0) + COALESCE((
+            SELECT SUM(r.quantity * r.daily_payment * (r.date_to - r.date_from + 1)) FROM services_rent r
+            WHERE r.invoice_id = i.id
+        ), 0),
+        items_count = (SELECT COUNT(*) FROM services_purchase p WHERE p.invoice_id = i.id)
+            + (SELECT COUNT(*) FROM services_rent r WHERE r.invoice_id = i.id)
+    WHERE i.status = 1
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0007_idempotency_key'),
+    ]
+
+    operations = [
+        # Перед созданием индекса сервисы нескольких открытых корзин пользователя объединяются в одну
+        migrations.RunSQL(MERGE_OPEN_INVOICES_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 1)), fields=('user_id',), name='services_invoice_one_open'),
+        ),
+    ]
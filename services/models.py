@@ -1,10 +1,14 @@
+import datetime
+
 from django.contrib import admin
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from accounts.models import CustomUser
 from drf_store import settings
+from items.cache import bump_generation
 from items.models import Item
 from services.managers import InvoiceManager, RentManager, ServiceManager
 
@@ -35,12 +39,23 @@ class Invoice(models.Model):
         _('status updated'),
         default=timezone.now
     )
+    # Поддерживаются сигналами сервисов (services.signals), проверка - команда rebuild_invoice_totals
+    total = models.PositiveIntegerField(_('total'), default=0, editable=False)
+    items_count = models.PositiveIntegerField(_('items count'), default=0, editable=False)
 
     objects = InvoiceManager()
 
     class Meta:
         verbose_name = _('invoice')
         verbose_name_plural = _('invoices')
+        indexes = [
+            # История покупок пользователя: фильтр по статусу и сортировка по status_updated
+            models.Index(fields=['user_id', 'status', 'status_updated'], name='services_invoice_history_idx'),
+        ]
+        constraints = [
+            # Корзина: не больше одного неоплаченного (UNPAID) счета у пользователя, см. InvoiceManager.get_open_invoice
+            models.UniqueConstraint(fields=['user_id'], condition=models.Q(status=1), name='services_invoice_one_open'),
+        ]
         permissions = [
             ('can_change_status', _('Can change status'))
         ]
@@ -48,15 +63,20 @@ class Invoice(models.Model):
     def __str__(self):
         return f'[{self.id}] {self.user_id}'
 
+    def save(self, *args, **kwargs):
+        # total и items_count изменяются только через InvoiceQuerySet.update_totals,
+        # поэтому сохранение устаревшего экземпляра не перезаписывает их
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('total', 'items_count')
+            ]
+        super().save(*args, **kwargs)
+
     @property
     @admin.display(description=_('Total price'))
     def price_total(self):
-        total = 0
-        for obj in self.purchase_set.all():
-            total += obj.price
-        for obj in self.rent_set.all():
-            total += obj.price
-        return total
+        return self.total
 
     def get_final_price_and_currency(self):
         """
@@ -79,6 +99,7 @@ class Service(models.Model):
     item = models.ForeignKey(to=Item, on_delete=models.CASCADE, verbose_name=_('item'))
     invoice = models.ForeignKey(to=Invoice, on_delete=models.CASCADE, verbose_name=_('invoice'))
     quantity = models.PositiveSmallIntegerField(_('quantity'), default=1, blank=False)
+    reserved_until = models.DateTimeField(_('reserved until'), null=True, blank=True, db_index=True)
 
     path_template = 'services/item_service.html'
 
@@ -90,9 +111,15 @@ class Service(models.Model):
     def __str__(self):
         return f'[{self.invoice.status}]-{self.item.title}'
 
+    @staticmethod
+    def get_reservation_deadline():
+        """Время окончания резервирования товара, добавленного в корзину сейчас"""
+        return timezone.now() + datetime.timedelta(minutes=settings.CART_RESERVATION_TTL)
+
+    @transaction.atomic
     def delete(self, using=None, keep_parents=False):
-        self.item.count_available += self.quantity
-        self.item.save()
+        Item.objects.restock(self.item_id, self.quantity)
+        bump_generation(Item)
         result_delete = super().delete()
         if not self.invoice.purchase_set.exists() and not self.invoice.rent_set.exists():
             self.invoice.delete()
@@ -124,3 +151,25 @@ class Rent(Service):
     class Meta:
         verbose_name = _('rent')
         verbose_name_plural = _('rents')
+
+
+class IdempotencyKey(models.Model):
+    """Сохраненный ответ на изменяющий запрос с заголовком Idempotency-Key (services.idempotency)"""
+    user = models.ForeignKey(to=CustomUser, on_delete=models.CASCADE, verbose_name=_('user'))
+    key = models.CharField(_('key'), max_length=255)
+    # Хэш метода, пути и тела запроса: ключ нельзя повторно использовать для другого запроса
+    fingerprint = models.CharField(_('request fingerprint'), max_length=64)
+    status_code = models.PositiveSmallIntegerField(_('status code'), null=True)
+    response = models.JSONField(_('response'), null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    expires_at = models.DateTimeField(_('expires at'), db_index=True)
+
+    class Meta:
+        verbose_name = _('idempotency key')
+        verbose_name_plural = _('idempotency keys')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='services_idempotency_key_unique'),
+        ]
+
+    def __str__(self):
+        return f'[{self.user_id}] {self.key}'
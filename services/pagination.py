@@ -0,0 +1,9 @@
+from items.pagination import CatalogCursorPagination
+
+
+class HistoryCursorPagination(CatalogCursorPagination):
+    """
+    Постраничный вывод истории покупок по курсору: от последних изменений статуса к ранним.
+    Запрос страницы идет по индексу (user_id, status, status_updated).
+    """
+    ordering = '-status_updated'
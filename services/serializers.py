@@ -14,6 +14,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
             'item',
             'invoice',
             'quantity',
+            'reserved_until',
             'path_template',
         ]
 
@@ -42,12 +43,15 @@ class RentSerializer(serializers.ModelSerializer):
             'item',
             'invoice',
             'quantity',
+            'reserved_until',
             'path_template',
             'date_from',
             'date_to',
             'daily_payment',
             'price'
         ]
+        # price аннотируется в RentManager
+        depends_on = {'price': []}
 
     def get_price(self, obj):
         return obj.price
@@ -64,6 +68,25 @@ class CreateRentSerializer(serializers.ModelSerializer):
         ]
 
 
+class CartLineSerializer(serializers.Serializer):
+    """Строка пакетного добавления в корзину: покупка или аренда товара"""
+    service = serializers.ChoiceField(['purchase', 'rent'])
+    item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        """Для аренды обязательны даты, товар арендуется в одном экземпляре"""
+        if attrs['service'] == 'rent':
+            if 'date_from' not in attrs or 'date_to' not in attrs:
+                raise serializers.ValidationError('Rent requires date_from and date_to')
+            if attrs['date_from'] > attrs['date_to']:
+                raise serializers.ValidationError('date_from must not be later than date_to')
+            attrs['quantity'] = 1
+        return attrs
+
+
 class InvoiceSerializer(serializers.ModelSerializer):
     purchase_set = PurchaseSerializer(many=True, required=False, read_only=True)
     rent_set = RentSerializer(many=True, required=False, read_only=True)
@@ -80,13 +103,44 @@ class InvoiceSerializer(serializers.ModelSerializer):
             'status_updated',
             'price_total',
             'final_price',
+            'items_count',
             'purchase_set',
             'rent_set',
         ]
+        # final_price аннотируется в InvoiceQuerySet.with_totals
+        depends_on = {
+            'price_total': ['total'],
+            'final_price': [],
+        }
 
     def get_final_price(self, obj: Invoice) -> int:
         """Return final price with discount
         :param obj: Invoice
         :return: int
         """
+        if hasattr(obj, 'final_price'):
+            return obj.final_price
         return obj.get_final_price_and_currency()[0]
+
+
+class InvoiceSummarySerializer(InvoiceSerializer):
+    """Заголовок и суммы счета без сервисов, сервисы - по ссылке details"""
+    purchase_set = None
+    rent_set = None
+    details = serializers.HyperlinkedIdentityField(view_name='services:history-detail')
+
+    class Meta(InvoiceSerializer.Meta):
+        fields = [
+            'id',
+            'status',
+            'date_created',
+            'status_updated',
+            'price_total',
+            'final_price',
+            'items_count',
+            'details',
+        ]
+        depends_on = {
+            **InvoiceSerializer.Meta.depends_on,
+            'details': [],
+        }
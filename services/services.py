@@ -1,18 +1,18 @@
 import datetime
 import logging
-from smtplib import SMTPDataError
 
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
 from django.db import transaction
-from django.template.loader import render_to_string
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Value, When
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.generics import get_object_or_404
 
-from accounts.models import CustomUser
+from items.cache import bump_generation
 from items.models import Item
+from notifications.services import enqueue_email
 from services.models import Invoice, Purchase, Rent
 
 logger = logging.getLogger(__name__)
@@ -20,6 +20,20 @@ logger = logging.getLogger(__name__)
 
 def pay_the_cart(request, invoice: Invoice) -> None:
     """Оплата заказа в корзине"""
+    # Блокировка счета: параллельно release_reservations может освобождать его просроченные товары.
+    # Суммы вычисляются в SQL (with_totals) после блокировки
+    locked = (
+        Invoice.objects.with_totals()
+        .select_for_update(of=('self',))
+        .filter(pk=invoice.pk, status=Invoice.InvoiceStatuses.UNPAID.value)
+        .first()
+    )
+    if locked is None:
+        raise ValueError(_('Корзина больше не доступна'))
+    invoice = locked
+    for model in (Purchase, Rent):
+        model._base_manager.filter(invoice=invoice).update(reserved_until=None)
+
     invoice.status = Invoice.InvoiceStatuses.PAID.value
     invoice.status_updated = timezone.now()
 
@@ -39,20 +53,14 @@ def create_purchase(request, data: dict) -> None:
     item = get_object_or_404(Item, pk=data['item'])
     quantity = int(data['quantity'])
 
-    if item.count_available >= quantity:
-        invoice, created = Invoice.objects.get_or_create(
-            user_id=CustomUser.objects.get(pk=request.user.id),
-            status=Invoice.InvoiceStatuses.UNPAID.value
-        )
-        Purchase(item=item, invoice=invoice, quantity=quantity).save()
-        item.count_available -= quantity
-        item.save()
-
-        try:
-            data['item'] = item
-            sent_email_add_item_to_cart(request, data)
-        except SMTPDataError:
-            logger.error('Сообщение не было отправлено', exc_info=True)
+    if Item.objects.reserve(item.pk, quantity):
+        invoice = Invoice.objects.get_open_invoice(request.user.id)
+        Purchase(item=item, invoice=invoice, quantity=quantity,
+                 reserved_until=Purchase.get_reservation_deadline()).save()
+        bump_generation(Item)
+
+        data['item'] = item
+        sent_email_add_item_to_cart(request, data)
     else:
         raise ValueError(_('Неверное количество товара'))
 
@@ -62,29 +70,134 @@ def create_rent(request, data: dict) -> None:
     """Создание сервиса аренды для товара (добавление в корзину)"""
     item = get_object_or_404(Item, pk=data['item'])
 
-    if item.count_available >= 1:
-        invoice, created = Invoice.objects.get_or_create(
-            user_id=CustomUser.objects.get(pk=request.user.id),
-            status=Invoice.InvoiceStatuses.UNPAID.value
-        )
+    if Item.objects.reserve(item.pk, 1):
+        invoice = Invoice.objects.get_open_invoice(request.user.id)
         Rent(item=item,
              invoice=invoice,
              quantity=1,
              date_from=data['date_from'],
              date_to=data['date_to'],
-             daily_payment=item.price * settings.PERCENT_OF_PRICE).save()
-        item.count_available -= 1
-        item.save()
-
-        try:
-            data['item'] = item
-            sent_email_add_item_to_cart(request, data)
-        except SMTPDataError:
-            logger.error('Сообщение не было отправлено', exc_info=True)
+             daily_payment=item.price * settings.PERCENT_OF_PRICE,
+             reserved_until=Rent.get_reservation_deadline()).save()
+        bump_generation(Item)
+
+        data['item'] = item
+        sent_email_add_item_to_cart(request, data)
     else:
         raise ValueError(_('Товар отсутствует на складе'))
 
 
+@transaction.atomic
+def add_lines_to_cart(request, lines: list[dict]) -> Invoice:
+    """
+    Добавление в корзину списка покупок и аренд, все или ничего.
+    Товары резервируются одним UPDATE, счет получается один раз,
+    сервисы вставляются одним bulk_create на модель, письмо ставится в очередь одно.
+    :param lines: проверенные данные CartLineSerializer
+    """
+    items = Item.objects.in_bulk({line['item'] for line in lines})
+    missing = sorted({line['item'] for line in lines} - set(items))
+    if missing:
+        raise ValueError(_('Товары не найдены: ') + ', '.join(map(str, missing)))
+
+    quantities = {}
+    for line in lines:
+        quantities[line['item']] = quantities.get(line['item'], 0) + line['quantity']
+    if not Item.objects.reserve_many(quantities):
+        raise ValueError(_('Неверное количество товара'))
+
+    invoice = Invoice.objects.get_open_invoice(request.user.id)
+    deadline = Purchase.get_reservation_deadline()
+    Purchase.objects.bulk_create([
+        Purchase(item=items[line['item']], invoice=invoice, quantity=line['quantity'], reserved_until=deadline)
+        for line in lines if line['service'] == 'purchase'
+    ])
+    Rent.objects.bulk_create([
+        Rent(item=items[line['item']],
+             invoice=invoice,
+             quantity=1,
+             date_from=line['date_from'],
+             date_to=line['date_to'],
+             daily_payment=items[line['item']].price * settings.PERCENT_OF_PRICE,
+             reserved_until=deadline)
+        for line in lines if line['service'] == 'rent'
+    ])
+    # bulk_create не отправляет сигналы, поэтому суммы счета пересчитываются явно
+    Invoice.objects.filter(pk=invoice.pk).update_totals()
+    bump_generation(Item)
+
+    sent_email_lines_added_to_cart(request, [{**line, 'item': items[line['item']]} for line in lines])
+    return invoice
+
+
+def release_expired_lines(model, batch_size: int) -> int:
+    """
+    Освобождение пачки просроченных товаров неоплаченных корзин одной модели сервиса.
+    Строки и их счета блокируются с SKIP LOCKED (параллельные обработчики и оплата не ждут друг друга),
+    склад пополняется одним UPDATE, строки удаляются одним DELETE, суммы счетов пересчитываются
+    одним UPDATE, опустевшие счета удаляются одним DELETE.
+    :return: количество освобожденных строк
+    """
+    unpaid = Invoice.InvoiceStatuses.UNPAID.value
+    lines = list(
+        model._base_manager
+        .select_for_update(skip_locked=True, of=('self',))
+        .filter(reserved_until__lt=timezone.now(), invoice__status=unpaid)
+        .order_by('reserved_until')
+        .values_list('pk', 'item_id', 'quantity', 'invoice_id')[:batch_size]
+    )
+    if not lines:
+        return 0
+    invoices = set(
+        Invoice._base_manager
+        .select_for_update(skip_locked=True)
+        .filter(pk__in={invoice_id for *_, invoice_id in lines}, status=unpaid)
+        .values_list('pk', flat=True)
+    )
+    lines = [line for line in lines if line[3] in invoices]
+    if not lines:
+        return 0
+
+    quantities = {}
+    for _pk, item_id, quantity, _invoice_id in lines:
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    Item.objects.filter(pk__in=quantities).update(
+        count_available=F('count_available') + Case(
+            *(When(pk=item_id, then=Value(quantity)) for item_id, quantity in quantities.items()),
+            output_field=IntegerField(),
+        ),
+    )
+    # DELETE без сигналов post_delete: суммы счетов пачки пересчитываются одним UPDATE ниже
+    released = model._base_manager.filter(pk__in=[line[0] for line in lines])
+    released._raw_delete(released.db)
+    Invoice.objects.filter(pk__in=invoices).update_totals()
+    Invoice._base_manager.filter(pk__in=invoices).exclude(
+        Exists(Purchase._base_manager.filter(invoice=OuterRef('pk')))
+    ).exclude(
+        Exists(Rent._base_manager.filter(invoice=OuterRef('pk')))
+    ).delete()
+    return len(lines)
+
+
+def release_expired_reservations(batch_size: int = 1000) -> int:
+    """
+    Возврат на склад товаров, резервирование которых в неоплаченных корзинах истекло.
+    Каждая пачка обрабатывается в отдельной транзакции.
+    :return: количество освобожденных строк корзин
+    """
+    released = 0
+    for model in (Purchase, Rent):
+        while True:
+            with transaction.atomic():
+                count = release_expired_lines(model, batch_size)
+            released += count
+            if count < batch_size:
+                break
+    if released:
+        bump_generation(Item)
+    return released
+
+
 def get_data_for_rent(item_id: int) -> tuple[dict, dict]:
     """Return data for present at rent form"""
     data = {
@@ -100,33 +213,31 @@ def get_data_for_rent(item_id: int) -> tuple[dict, dict]:
 
 
 def sent_email_payment_done(request, invoice):
-    """Отправка email пользователю об успешной оплате"""
-    current_site = get_current_site(request)
-    subject = 'Payment is done!'
-    message = render_to_string('services/email_payment_done.html', {
+    """Постановка в очередь email пользователю об успешной оплате"""
+    enqueue_email(request.user.email, 'Payment is done!', template_name='services/email_payment_done.html', context={
         'user': request.user,
         'invoice': invoice,
-        'current_site': current_site,
+        'current_site': str(get_current_site(request)),
     })
 
-    try:
-        request.user.email_user(subject, message)
-    except SMTPDataError:
-        logger.error('Сообщение не было отправлено', exc_info=True)
-
 
 def sent_email_add_item_to_cart(request, data):
-    """Отправка email пользователю о добавлении товара в корзину"""
+    """Постановка в очередь email пользователю о добавлении товара в корзину"""
     subject = _(f'Add {data["item"]} to cart')
-    current_site = get_current_site(request)
-    message = render_to_string('services/email_add_to_cart.html', {
+    enqueue_email(request.user.email, subject, template_name='services/email_add_to_cart.html', context={
         'user': request.user,
         'data': data,
-        'current_site': current_site,
+        'current_site': str(get_current_site(request)),
         'cart_link': request.build_absolute_uri(reverse('services:cart'))
     })
 
-    try:
-        request.user.email_user(subject, message)
-    except SMTPDataError:
-        logger.error('Сообщение не было отправлено', exc_info=True)
+
+def sent_email_lines_added_to_cart(request, lines):
+    """Постановка в очередь одного email пользователю о добавлении списка товаров в корзину"""
+    enqueue_email(request.user.email, _('Add items to cart'), template_name='services/email_add_lines_to_cart.html',
+                  context={
+                      'user': request.user,
+                      'lines': lines,
+                      'current_site': str(get_current_site(request)),
+                      'cart_link': request.build_absolute_uri(reverse('services:cart'))
+                  })
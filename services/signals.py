@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from items.models import Book, Figure, Item, Magazine
+from items.signals import items_repriced
+from services.models import Invoice, Purchase, Rent
+
+
+def update_invoices_of_items(pks) -> None:
+    """Пересчет сумм счетов, в которых есть покупки товаров (стоимость покупки зависит от цены товара)"""
+    Invoice.objects.filter(pk__in=Purchase._base_manager.filter(item__in=pks).values('invoice')).update_totals()
+
+
+@receiver(pre_save, sender=Purchase)
+@receiver(pre_save, sender=Rent)
+def collect_old_invoice(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._old_invoice_id = sender._base_manager.filter(pk=instance.pk).values_list('invoice', flat=True).first()
+
+
+@receiver(post_save, sender=Purchase)
+@receiver(post_save, sender=Rent)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_delete, sender=Rent)
+def update_invoice_totals(sender, instance, **kwargs):
+    pks = {instance.invoice_id, instance.__dict__.pop('_old_invoice_id', None)} - {None}
+    Invoice.objects.filter(pk__in=pks).update_totals()
+
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Magazine)
+@receiver(pre_save, sender=Figure)
+def check_item_price_changed(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._price_changed = Item.objects.filter(pk=instance.pk).exclude(price=instance.price).exists()
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Magazine)
+@receiver(post_save, sender=Figure)
+def update_invoices_on_item_repriced(sender, instance, **kwargs):
+    if instance.__dict__.pop('_price_changed', False):
+        update_invoices_of_items([instance.pk])
+
+
+@receiver(items_repriced)
+def update_invoices_on_items_repriced(sender, pks, **kwargs):
+    update_invoices_of_items(pks)
@@ -7,8 +7,10 @@ register = template.Library()
 
 @register.simple_tag(name='count_items')
 def count_items_in_invoice(user):
-    try:
-        invoice = Invoice.objects.get(user_id=user.id, status=Invoice.InvoiceStatuses.UNPAID.value)
-        return invoice.purchase_set.count() + invoice.rent_set.count()
-    except Invoice.DoesNotExist:
-        return 0
+    items_count = (
+        Invoice.objects.open_for(user.id)
+        .prefetch_related(None)
+        .values_list('items_count', flat=True)
+        .first()
+    )
+    return items_count or 0
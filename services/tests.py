@@ -1,3 +1,626 @@
-from django.test import TestCase
+import datetime
+import threading
+from io import StringIO
 
-# Create your tests here.
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from items.models import Item
+from items.signals import items_repriced
+from notifications.models import OutgoingEmail
+from services.models import IdempotencyKey, Invoice, Purchase, Rent
+from services.services import pay_the_cart, release_expired_reservations
+from services.templatetags.services_extras import count_items_in_invoice
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(email='buyer@bar.com', password='Qw789456')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+@pytest.fixture
+def item(db):
+    return Item.objects.create(title='Item', price=100, count_available=5, slug='item')
+
+
+class TestReservation:
+
+    def test_reserve(self, item):
+        assert Item.objects.reserve(item.pk, 3)
+        assert not Item.objects.reserve(item.pk, 3)
+        assert not Item.objects.reserve(item.pk, 0)
+
+        item.refresh_from_db()
+        assert item.count_available == 2
+
+    def test_restock(self, item):
+        Item.objects.restock(item.pk, 2)
+
+        item.refresh_from_db()
+        assert item.count_available == 7
+
+    def test_create_purchase(self, client, item):
+        response = client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 2})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        item.refresh_from_db()
+        assert item.count_available == 3
+        assert Purchase.objects.get().quantity == 2
+
+    def test_create_purchase_not_enough(self, client, item):
+        response = client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 6})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Invoice.objects.exists()
+        item.refresh_from_db()
+        assert item.count_available == 5
+
+    def test_create_rent(self, client, item):
+        data = {'item': item.pk, 'date_from': '2022-01-01', 'date_to': '2022-01-03'}
+
+        response = client.post(reverse('services:rent'), data)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        item.refresh_from_db()
+        assert item.count_available == 4
+
+    def test_delete_service_restocks(self, client, item):
+        client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 2})
+
+        Purchase.objects.get().delete()
+
+        item.refresh_from_db()
+        assert item.count_available == 5
+        assert not Invoice.objects.exists()
+
+
+class TestReservationExpiry:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, client, item):
+        self.client = client
+        self.item = item
+        self.other = Item.objects.create(title='Other', price=10, count_available=5, slug='other')
+
+    def expire(self, *lines):
+        for line in lines:
+            type(line)._base_manager.filter(pk=line.pk).update(
+                reserved_until=timezone.now() - datetime.timedelta(minutes=1)
+            )
+
+    def test_reserved_until_set(self):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 1})
+
+        assert Purchase.objects.get().reserved_until > timezone.now()
+
+    def test_release_expired(self, user):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 2})
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 1})
+        self.client.post(reverse('services:purchase'), {'item': self.other.pk, 'quantity': 1})
+        self.client.post(reverse('services:rent'), {'item': self.other.pk, 'date_from': '2022-01-01',
+                                                    'date_to': '2022-01-02'})
+        purchases = list(Purchase.objects.order_by('pk'))
+        self.expire(purchases[0], purchases[1], Rent.objects.get())
+
+        assert release_expired_reservations(batch_size=1) == 3
+
+        self.item.refresh_from_db()
+        self.other.refresh_from_db()
+        assert self.item.count_available == 5
+        assert self.other.count_available == 4
+        assert list(Purchase.objects.all()) == [purchases[2]]
+        invoice = Invoice.objects.get()
+        assert (invoice.total, invoice.items_count) == (self.other.price, 1)
+
+    def test_release_updates_totals_once(self):
+        items = [Item.objects.create(title=f'Item {i}', price=1, count_available=5, slug=f'item-{i}')
+                 for i in range(20)]
+        for item in items:
+            self.client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 1})
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 1})
+        self.expire(*Purchase.objects.filter(item__in=items))
+
+        with CaptureQueriesContext(connection) as context:
+            assert release_expired_reservations() == 20
+
+        totals_updates = [query['sql'] for query in context.captured_queries
+                          if query['sql'].startswith('UPDATE "services_invoice"')]
+        assert len(totals_updates) == 1
+        invoice = Invoice.objects.get()
+        assert (invoice.total, invoice.items_count) == (self.item.price, 1)
+
+    def test_release_deletes_empty_invoices(self):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 2})
+        self.expire(Purchase.objects.get())
+
+        out = StringIO()
+        call_command('release_reservations', stdout=out)
+
+        assert 'Released 1 cart lines' in out.getvalue()
+        assert not Invoice.objects.exists()
+        self.item.refresh_from_db()
+        assert self.item.count_available == 5
+
+    def test_paid_lines_not_released(self):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 2})
+        purchase = Purchase.objects.get()
+        self.expire(purchase)
+        Invoice.objects.update(status=Invoice.InvoiceStatuses.PAID.value)
+
+        assert release_expired_reservations() == 0
+        assert Purchase.objects.exists()
+
+    def test_pay_clears_reservation(self, user, rf):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 2})
+        request = rf.put(reverse('services:cart'))
+        request.user = user
+
+        pay_the_cart(request, Invoice.objects.get())
+
+        assert Purchase.objects.get().reserved_until is None
+        assert Invoice.objects.get().status == Invoice.InvoiceStatuses.PAID.value
+
+
+class TestInvoiceTotals:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, user):
+        self.user = user
+        self.items = [
+            Item.objects.create(title=f'Item {i}', price=100 * (i + 1), count_available=10, slug=f'item-{i}')
+            for i in range(3)
+        ]
+
+    def create_invoice(self, user=None, status=Invoice.InvoiceStatuses.UNPAID.value):
+        invoice = Invoice.objects.create(user_id=user or self.user, status=status)
+        Purchase.objects.create(invoice=invoice, item=self.items[0], quantity=2)
+        Purchase.objects.create(invoice=invoice, item=self.items[1], quantity=1)
+        Rent.objects.create(invoice=invoice, item=self.items[2], daily_payment=30,
+                            date_from=datetime.date(2022, 1, 1), date_to=datetime.date(2022, 1, 3))
+        return invoice
+
+    @pytest.mark.parametrize('currency', [0, 50, 1000])
+    def test_with_totals(self, currency):
+        self.user.profile.currency = currency
+        self.user.profile.save()
+        invoice = self.create_invoice()
+
+        annotated = Invoice.objects.with_totals().with_subtotals().get(pk=invoice.pk)
+
+        assert annotated.purchase_total == 400
+        assert annotated.rent_total == 90
+        assert annotated.lines_count == annotated.items_count == 3
+        assert annotated.total_price == annotated.price_total == 490
+        final_price, _ = Invoice.objects.get(pk=invoice.pk).get_final_price_and_currency()
+        assert annotated.final_price == pytest.approx(final_price)
+
+    def test_empty_invoice(self):
+        invoice = Invoice.objects.create(user_id=self.user)
+
+        assert Invoice.objects.with_totals().get(pk=invoice.pk).price_total == 0
+
+    def test_totals_maintained(self):
+        invoice = self.create_invoice()
+        purchase = Purchase.objects.get(item=self.items[0])
+
+        purchase.quantity = 1
+        purchase.save()
+        invoice.refresh_from_db()
+        assert (invoice.total, invoice.items_count) == (390, 3)
+
+        purchase.delete()
+        invoice.refresh_from_db()
+        assert (invoice.total, invoice.items_count) == (290, 2)
+
+        self.items[1].price = 1000
+        self.items[1].save()
+        invoice.refresh_from_db()
+        assert invoice.total == 1090
+
+    def test_totals_updated_on_bulk_reprice(self):
+        invoice = self.create_invoice()
+        Item.objects.filter(pk=self.items[0].pk).update(price=10)
+
+        items_repriced.send(sender=Item, pks=[self.items[0].pk])
+
+        invoice.refresh_from_db()
+        assert invoice.total == 20 + 200 + 90
+
+    def test_stale_invoice_save_keeps_totals(self):
+        invoice = Invoice.objects.create(user_id=self.user)
+        Purchase.objects.create(invoice=invoice, item=self.items[0], quantity=2)
+
+        invoice.status = Invoice.InvoiceStatuses.CANCELED.value
+        invoice.save()
+
+        invoice.refresh_from_db()
+        assert invoice.total == 200
+
+    def test_rebuild_command(self):
+        invoice = self.create_invoice()
+        out = StringIO()
+        call_command('rebuild_invoice_totals', verify=True, stdout=out)
+        assert 'correct' in out.getvalue()
+
+        Invoice.objects.filter(pk=invoice.pk).update(total=0, items_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_invoice_totals', verify=True, stdout=out, stderr=StringIO())
+        call_command('rebuild_invoice_totals', stdout=out)
+
+        invoice.refresh_from_db()
+        assert 'Rebuilt totals of 1 invoices' in out.getvalue()
+        assert (invoice.total, invoice.items_count) == (490, 3)
+
+    def test_history_totals(self, client):
+        self.create_invoice(status=Invoice.InvoiceStatuses.PAID.value)
+
+        response = client.get(reverse('services:history'))
+
+        assert response.data['results'][0]['price_total'] == 490
+        assert response.data['results'][0]['final_price'] == pytest.approx(490)
+
+    def test_history_does_not_read_services_for_totals(self, client):
+        for _ in range(3):
+            self.create_invoice(status=Invoice.InvoiceStatuses.PAID.value)
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('services:history'))
+
+        invoice_queries = [query['sql'] for query in context.captured_queries
+                           if 'FROM "services_invoice"' in query['sql']]
+        assert len(invoice_queries) == 1
+        assert 'services_purchase' not in invoice_queries[0] and 'services_rent' not in invoice_queries[0]
+
+    def test_admin_changelist_constant_queries(self, admin_client):
+        url = reverse('admin:services_invoice_changelist')
+        self.create_invoice()
+        with CaptureQueriesContext(connection) as single:
+            admin_client.get(url)
+        for i in range(5):
+            self.create_invoice(user=CustomUser.objects.create_user(email=f'user{i}@bar.com', password='Qw789456'))
+
+        with CaptureQueriesContext(connection) as many:
+            response = admin_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(many.captured_queries) == len(single.captured_queries)
+        assert not [query for query in many.captured_queries
+                    if 'FROM "services_purchase"' in query['sql'] or 'FROM "services_rent"' in query['sql']]
+
+
+class TestCartLines:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, client, item):
+        self.client = client
+        self.item = item
+        self.other = Item.objects.create(title='Other', price=10, count_available=1, slug='other')
+
+    def post_lines(self, lines):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('services:cart-lines'), lines, format='json')
+        return response, len(context.captured_queries)
+
+    def test_add_lines(self, user):
+        response, _ = self.post_lines([
+            {'service': 'purchase', 'item': self.item.pk, 'quantity': 2},
+            {'service': 'purchase', 'item': self.item.pk, 'quantity': 1},
+            {'service': 'rent', 'item': self.other.pk, 'date_from': '2022-01-01', 'date_to': '2022-01-02'},
+        ])
+
+        assert response.status_code == status.HTTP_201_CREATED
+        self.item.refresh_from_db()
+        self.other.refresh_from_db()
+        assert (self.item.count_available, self.other.count_available) == (2, 0)
+        invoice = Invoice.objects.get()
+        assert (invoice.user_id, invoice.total, invoice.items_count) == (user, 300 + 2, 3)
+        assert all(line.reserved_until for line in [*Purchase.objects.all(), *Rent.objects.all()])
+        assert OutgoingEmail.objects.get().template_name == 'services/email_add_lines_to_cart.html'
+
+    def test_uses_existing_cart(self):
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 1})
+
+        self.post_lines([{'service': 'purchase', 'item': self.item.pk}])
+
+        assert Invoice.objects.get().items_count == 2
+
+    def test_all_or_nothing(self):
+        response, _ = self.post_lines([
+            {'service': 'purchase', 'item': self.item.pk, 'quantity': 2},
+            {'service': 'purchase', 'item': self.other.pk, 'quantity': 2},
+        ])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        self.item.refresh_from_db()
+        assert self.item.count_available == 5
+        assert not Invoice.objects.exists() and not OutgoingEmail.objects.exists()
+
+    def test_unknown_item(self):
+        response, _ = self.post_lines([{'service': 'purchase', 'item': 999999}])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert '999999' in response.data['error']
+
+    def test_validation(self):
+        response, _ = self.post_lines([
+            {'service': 'purchase', 'item': self.item.pk, 'quantity': 0},
+            {'service': 'rent', 'item': self.item.pk},
+        ])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'quantity' in response.data[0]
+        assert 'non_field_errors' in response.data[1]
+        assert self.post_lines([])[0].status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_constant_queries(self):
+        items = [Item.objects.create(title=f'Item {i}', price=1, count_available=5, slug=f'item-{i}')
+                 for i in range(10)]
+        self.post_lines([{'service': 'purchase', 'item': self.item.pk}])
+        _, queries_small = self.post_lines([{'service': 'purchase', 'item': items[0].pk}])
+        _, queries_large = self.post_lines([{'service': 'purchase', 'item': item.pk} for item in items] +
+                                           [{'service': 'rent', 'item': item.pk, 'date_from': '2022-01-01',
+                                             'date_to': '2022-01-02'} for item in items])
+
+        # Одна дополнительная вставка строк Rent
+        assert queries_small + 1 == queries_large
+
+
+class TestIdempotency:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, client, item):
+        self.client = client
+        self.item = item
+
+    def purchase(self, key, quantity=1):
+        return self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': quantity},
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_purchase(self):
+        first = self.purchase('key-1')
+        second = self.purchase('key-1')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.data == first.data
+        assert second['Idempotent-Replayed'] == 'true'
+        assert Purchase.objects.count() == 1
+        self.item.refresh_from_db()
+        assert self.item.count_available == 4
+
+    def test_other_keys_execute(self):
+        self.purchase('key-1')
+        self.purchase('key-2')
+        self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 1})
+
+        assert Purchase.objects.count() == 3
+
+    def test_key_reused_for_other_request(self):
+        self.purchase('key-1')
+
+        response = self.purchase('key-1', quantity=2)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Purchase.objects.count() == 1
+
+    def test_expired_key(self):
+        self.purchase('key-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        response = self.purchase('key-1')
+
+        assert 'Idempotent-Replayed' not in response
+        assert Purchase.objects.count() == 2
+
+    def test_failed_request_not_stored(self):
+        response = self.client.post(reverse('services:purchase'), {'item': self.item.pk, 'quantity': 0},
+                                    HTTP_IDEMPOTENCY_KEY='key-1')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not IdempotencyKey.objects.exists()
+
+    def test_replay_payment(self, user):
+        # DjangoObjectPermissions корзины без объектных прав пропускает только суперпользователя
+        user.is_superuser = True
+        user.save()
+        self.purchase('key-1')
+
+        first = self.client.put(reverse('services:cart'), HTTP_IDEMPOTENCY_KEY='pay-1')
+        second = self.client.put(reverse('services:cart'), HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+        assert first.data['status'] == Invoice.InvoiceStatuses.PAID.value
+        assert OutgoingEmail.objects.filter(subject='Payment is done!').count() == 1
+
+    def test_clear_command(self):
+        self.purchase('key-1')
+        self.purchase('key-2')
+        IdempotencyKey.objects.filter(key='key-1').update(expires_at=timezone.now())
+        out = StringIO()
+
+        call_command('clear_idempotency_keys', batch_size=1, stdout=out)
+
+        assert 'Deleted 1 idempotency keys' in out.getvalue()
+        assert list(IdempotencyKey.objects.values_list('key', flat=True)) == ['key-2']
+
+
+class TestOpenInvoice:
+
+    def test_get_open_invoice(self, user):
+        with CaptureQueriesContext(connection) as context:
+            invoice = Invoice.objects.get_open_invoice(user.id)
+        assert len(context.captured_queries) == 1
+
+        assert Invoice.objects.get_open_invoice(user.id) == invoice
+        assert (invoice.user_id, invoice.status) == (user, Invoice.InvoiceStatuses.UNPAID.value)
+        Invoice.objects.filter(pk=invoice.pk).update(status=Invoice.InvoiceStatuses.PAID.value)
+        assert Invoice.objects.get_open_invoice(user.id) != invoice
+        assert Invoice.objects.count() == 2
+
+    def test_one_open_invoice(self, user):
+        Invoice.objects.create(user_id=user)
+        Invoice.objects.create(user_id=user, status=Invoice.InvoiceStatuses.PAID.value)
+
+        with pytest.raises(IntegrityError):
+            Invoice.objects.create(user_id=user)
+
+    def test_count_items(self, user, client, item):
+        client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 2})
+
+        with CaptureQueriesContext(connection) as context:
+            assert count_items_in_invoice(user) == 1
+        assert len(context.captured_queries) == 1
+
+
+class TestHistory:
+
+    @pytest.fixture(autouse=True)
+    def initial(self, user, client, item):
+        self.user = user
+        self.client = client
+        self.item = item
+
+    def create_invoices(self, quantity: int, status=Invoice.InvoiceStatuses.PAID.value, user=None) -> list:
+        invoices = []
+        for i in range(quantity):
+            invoice = Invoice.objects.create(user_id=user or self.user, status=status,
+                                             status_updated=timezone.now() - datetime.timedelta(days=i))
+            Purchase.objects.create(invoice=invoice, item=self.item, quantity=1)
+            invoices.append(invoice)
+        return invoices
+
+    def test_pagination(self):
+        invoices = self.create_invoices(5)
+        self.create_invoices(1, status=Invoice.InvoiceStatuses.CANCELED.value)
+        self.create_invoices(1, user=CustomUser.objects.create_user(email='other@bar.com', password='Qw789456'))
+
+        first = self.client.get(reverse('services:history'), {'page_size': 3})
+        second = self.client.get(first.data['next'])
+
+        assert [row['id'] for row in first.data['results']] == [invoice.id for invoice in invoices[:3]]
+        assert [row['id'] for row in second.data['results']] == [invoice.id for invoice in invoices[3:]]
+        assert second.data['next'] is None
+        assert len(first.data['results'][0]['purchase_set']) == 1
+
+    def test_summary(self):
+        invoice = self.create_invoices(3)[0]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('services:history'), {'summary': 1})
+
+        row = response.data['results'][0]
+        assert 'purchase_set' not in row
+        assert (row['id'], row['price_total'], row['items_count']) == (invoice.id, 100, 1)
+        assert row['details'].endswith(reverse('services:history-detail', args=[invoice.id]))
+        invoice_queries = [query['sql'] for query in context.captured_queries
+                           if 'services_' in query['sql']]
+        assert len(invoice_queries) == 1
+        assert 'services_purchase' not in invoice_queries[0]
+
+    def test_detail(self):
+        invoice = self.create_invoices(1)[0]
+        other = self.create_invoices(1, user=CustomUser.objects.create_user(email='other@bar.com',
+                                                                           password='Qw789456'))[0]
+
+        response = self.client.get(reverse('services:history-detail', args=[invoice.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['purchase_set'][0]['item']['id'] == self.item.id
+        assert self.client.get(reverse('services:history-detail', args=[other.id])).status_code == \
+            status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_reservations(item):
+    threads_count = 20
+    barrier = threading.Barrier(threads_count)
+    results = []
+
+    def reserve():
+        try:
+            barrier.wait()
+            results.append(Item.objects.reserve(item.pk, 1))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=reserve) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    item.refresh_from_db()
+    assert results.count(True) == 5
+    assert item.count_available == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_idempotent_requests(user, item):
+    threads_count = 5
+    barrier = threading.Barrier(threads_count)
+    responses = []
+    token = RefreshToken.for_user(user).access_token
+
+    def purchase():
+        try:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            barrier.wait()
+            responses.append(client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 1},
+                                         HTTP_IDEMPOTENCY_KEY='key-1'))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=purchase) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    item.refresh_from_db()
+    assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * threads_count
+    assert sum('Idempotent-Replayed' in response for response in responses) == threads_count - 1
+    assert Purchase.objects.count() == 1
+    assert item.count_available == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_carts(user):
+    threads_count = 10
+    barrier = threading.Barrier(threads_count)
+    items = [Item.objects.create(title=f'Item {i}', price=1, count_available=1, slug=f'item-{i}')
+             for i in range(threads_count)]
+    token = RefreshToken.for_user(user).access_token
+
+    def purchase(item):
+        try:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            barrier.wait()
+            client.post(reverse('services:purchase'), {'item': item.pk, 'quantity': 1})
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=purchase, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    invoice = Invoice.objects.get()
+    assert invoice.purchase_set.count() == invoice.items_count == threads_count
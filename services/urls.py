@@ -8,6 +8,9 @@ urlpatterns = [
     path('history/', views.HistoryViewSet.as_view(actions={
         'get': 'list'
     }), name='history'),
+    path('history/<int:pk>/', views.HistoryViewSet.as_view(actions={
+        'get': 'retrieve'
+    }), name='history-detail'),
     path('cart/', views.CartViewSet.as_view(actions={
         'get': 'get_cart',
         'patch': 'partial_update',
@@ -16,6 +19,9 @@ urlpatterns = [
     path('cart/<int:pk>/', views.CartViewSet.as_view(actions={
         'delete': 'delete_service'
     }), name='cart-delete-service'),
+    path('cart/lines/', views.CartLinesViewSet.as_view(actions={
+        'post': 'create',
+    }), name='cart-lines'),
     path('purchase/', views.PurchaseViewSet.as_view(actions={
         'post': 'create',
     }), name='purchase'),
@@ -3,15 +3,20 @@ import logging
 from django.db import transaction
 from rest_framework import status, viewsets
 from rest_framework.generics import get_object_or_404
-from rest_framework.mixins import CreateModelMixin, ListModelMixin
+from rest_framework.mixins import (CreateModelMixin, ListModelMixin,
+                                   RetrieveModelMixin)
 from rest_framework.permissions import DjangoObjectPermissions, IsAuthenticated
 from rest_framework.response import Response
 
+from services.idempotency import IdempotentMixin
 from services.models import Invoice, Purchase, Rent
+from services.pagination import HistoryCursorPagination
 from services.serializers import (AlterPurchaseSerializer,
-                                  CreateRentSerializer, InvoiceSerializer)
-from services.services import (create_purchase, create_rent, get_data_for_rent,
-                               pay_the_cart)
+                                  CartLineSerializer, CreateRentSerializer,
+                                  InvoiceSerializer, InvoiceSummarySerializer)
+from services.services import (add_lines_to_cart, create_purchase, create_rent,
+                               get_data_for_rent, pay_the_cart)
+from utils.queryset import OptimizeQuerysetMixin
 
 logger = logging.getLogger(__name__)
 
@@ -21,18 +26,14 @@ MAPPING_SERVICES_TO_MODELS = {
     }
 
 
-class CartViewSet(viewsets.GenericViewSet, ListModelMixin):
+class CartViewSet(IdempotentMixin, OptimizeQuerysetMixin, viewsets.GenericViewSet, ListModelMixin):
     """Корзина покупателя"""
     serializer_class = InvoiceSerializer
     permission_classes = [DjangoObjectPermissions]
-    queryset = Invoice.objects.all()
+    queryset = Invoice.objects.with_totals()
 
     def get_object(self):
-        invoice = get_object_or_404(
-            self.get_queryset(),
-            user_id=self.request.user.id,
-            status=Invoice.InvoiceStatuses.UNPAID.value
-        )
+        invoice = get_object_or_404(self.filter_queryset(self.get_queryset()).open_for(self.request.user.id))
         self.check_object_permissions(self.request, invoice)
         return invoice
 
@@ -42,9 +43,12 @@ class CartViewSet(viewsets.GenericViewSet, ListModelMixin):
         serializer = self.get_serializer(invoice)
         return Response(serializer.data)
 
-    @transaction.atomic
     def update(self, request, *args):
-        """Оплата корзины"""
+        """Оплата корзины (с заголовком Idempotency-Key повтор возвращает первый ответ)"""
+        return self.get_idempotent_response(self.pay, request, *args)
+
+    @transaction.atomic
+    def pay(self, request, *args):
         instance = self.get_object()
 
         try:
@@ -53,14 +57,9 @@ class CartViewSet(viewsets.GenericViewSet, ListModelMixin):
             logger.error('Оплата не прошла', exc_info=True)
             return Response({'error': 'Payment failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        instance.refresh_from_db()
+        # Суммы и статус перечитываются из базы после оплаты
+        instance = self.filter_queryset(self.get_queryset()).get(pk=instance.pk)
         serializer = self.get_serializer(instance)
-
-        if getattr(instance, '_prefetched_objects_cache', None):
-            # If 'prefetch_related' has been applied to a queryset, we need to
-            # forcibly invalidate the prefetch cache on the instance.
-            instance._prefetched_objects_cache = {}
-
         return Response(serializer.data)
 
     def partial_update(self, request, *args):
@@ -79,24 +78,43 @@ class CartViewSet(viewsets.GenericViewSet, ListModelMixin):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class HistoryViewSet(viewsets.GenericViewSet, ListModelMixin):
-    """История покупок пользователя"""
+class HistoryViewSet(OptimizeQuerysetMixin, viewsets.GenericViewSet, ListModelMixin, RetrieveModelMixin):
+    """
+    История покупок пользователя.
+    С параметром ?summary=1 список содержит только заголовки и суммы счетов (один запрос),
+    сервисы счета выводятся по ссылке details.
+    """
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = HistoryCursorPagination
+
+    def is_summary(self) -> bool:
+        return self.action == 'list' and self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return InvoiceSummarySerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        return Invoice.objects.\
+        queryset = Invoice.objects.with_totals().\
             filter(user_id=self.request.user.id).\
-            exclude(status=Invoice.InvoiceStatuses.CANCELED.value).\
-            order_by('-status_updated')
+            exclude(status=Invoice.InvoiceStatuses.CANCELED.value)
+        if self.is_summary():
+            # Связи менеджера не нужны заголовкам счетов
+            queryset = queryset.select_related(None).prefetch_related(None)
+        return queryset
 
 
-class PurchaseViewSet(viewsets.GenericViewSet, CreateModelMixin):
+class PurchaseViewSet(IdempotentMixin, viewsets.GenericViewSet, CreateModelMixin):
     """Покупка товара"""
     serializer_class = AlterPurchaseSerializer
     permission_classes = [IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
+        return self.get_idempotent_response(self.add_to_cart, request, *args, **kwargs)
+
+    def add_to_cart(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -107,7 +125,7 @@ class PurchaseViewSet(viewsets.GenericViewSet, CreateModelMixin):
             return Response({'error': e.args[0]}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class RentViewSet(viewsets.GenericViewSet, CreateModelMixin):
+class RentViewSet(IdempotentMixin, viewsets.GenericViewSet, CreateModelMixin):
     """Аренда товара"""
     serializer_class = CreateRentSerializer
     permission_classes = [IsAuthenticated]
@@ -123,6 +141,9 @@ class RentViewSet(viewsets.GenericViewSet, CreateModelMixin):
         return Response(result)
 
     def create(self, request, *args, **kwargs):
+        return self.get_idempotent_response(self.add_to_cart, request, *args, **kwargs)
+
+    def add_to_cart(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -131,3 +152,25 @@ class RentViewSet(viewsets.GenericViewSet, CreateModelMixin):
             return Response({'create': 'OK'}, status=status.HTTP_201_CREATED)
         except ValueError as e:
             return Response({'error': e.args[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CartLinesViewSet(IdempotentMixin, viewsets.GenericViewSet, CreateModelMixin):
+    """Добавление в корзину списка покупок и аренд одним запросом"""
+    serializer_class = CartLineSerializer
+    permission_classes = [IsAuthenticated]
+    batch_max_size = 100
+
+    def create(self, request, *args, **kwargs):
+        return self.get_idempotent_response(self.add_to_cart, request, *args, **kwargs)
+
+    def add_to_cart(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False,
+                                         max_length=self.batch_max_size)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            add_lines_to_cart(request, serializer.validated_data)
+            return Response({'create': 'OK', 'lines': len(serializer.validated_data)},
+                            status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({'error': e.args[0]}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,156 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+# Действия, для которых загружаются только выводимые сериализатором колонки
+READ_ACTIONS = ('list', 'retrieve')
+
+
+class QuerysetLookups:
+    """Связи и колонки, необходимые сериализатору"""
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        self.prunable = True
+
+    def apply(self, queryset, prune: bool = False):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if prune and self.prunable and self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def get_model_field(model, name):
+    """Поле модели по имени или по имени обратной связи (purchase_set)"""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        pass
+    for relation in model._meta.related_objects:
+        if relation.get_accessor_name() == name:
+            return relation
+    return None
+
+
+def add_relation_path(lookups: QuerysetLookups, model, path: str, prefix: str = '', in_prefetch: bool = False):
+    """
+    Добавление связей и колонок для пути вида relation__field
+    :return: модель, на которой закончился путь, или None, если путь проходит не по полям модели
+    """
+    for name in path.split('__'):
+        field = get_model_field(model, name)
+        if field is None:
+            return None
+        lookup = f'{prefix}{name}'
+        if field.many_to_many or field.one_to_many:
+            lookups.prefetch_related.add(lookup)
+            in_prefetch = True
+        elif field.is_relation:
+            if in_prefetch:
+                lookups.prefetch_related.add(lookup)
+            else:
+                lookups.select_related.add(lookup)
+                lookups.only.add(lookup)
+        elif not in_prefetch:
+            lookups.only.add(lookup)
+        if field.is_relation:
+            model = field.related_model
+        prefix = f'{lookup}__'
+    return model
+
+
+def collect_lookups(serializer, model, lookups: QuerysetLookups, prefix: str = '', in_prefetch: bool = False) -> bool:
+    """
+    Обход полей сериализатора (и вложенных сериализаторов) с накоплением связей в lookups
+    :return: можно ли ограничить колонки модели выводимыми полями
+    """
+    prunable = True
+    depends_on = getattr(getattr(serializer, 'Meta', None), 'depends_on', {})
+    if not in_prefetch:
+        lookups.only.add(f'{prefix}{model._meta.pk.name}')
+
+    for field_name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field_name in depends_on:
+            for path in depends_on[field_name]:
+                if add_relation_path(lookups, model, path, prefix, in_prefetch) is None:
+                    prunable = False
+            continue
+
+        source = field.source
+        if source == '*' or '.' in source:
+            prunable = False
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        model_field = get_model_field(model, source)
+        if model_field is None:
+            # Свойство или метод модели: неизвестно, какие колонки ему нужны
+            prunable = False
+            continue
+
+        if not isinstance(nested, serializers.BaseSerializer) or not model_field.is_relation:
+            if model_field.many_to_many or model_field.one_to_many:
+                lookups.prefetch_related.add(f'{prefix}{source}')
+            elif not in_prefetch:
+                # Для первичного ключа связанного объекта достаточно колонки внешнего ключа
+                lookups.only.add(f'{prefix}{source}')
+            continue
+
+        related_model = add_relation_path(lookups, model, source, prefix, in_prefetch)
+        nested_in_prefetch = in_prefetch or model_field.many_to_many or model_field.one_to_many
+        nested_prunable = collect_lookups(nested, related_model, lookups, f'{prefix}{source}__', nested_in_prefetch)
+        if nested_in_prefetch:
+            continue
+        if nested_prunable:
+            # Колонки связанной модели перечислены через prefix__field
+            lookups.only.discard(f'{prefix}{source}')
+        else:
+            lookups.only = {name for name in lookups.only if not name.startswith(f'{prefix}{source}__')}
+            lookups.only.add(f'{prefix}{source}')
+
+    return prunable
+
+
+@lru_cache(maxsize=None)
+def get_serializer_lookups(serializer_class) -> QuerysetLookups:
+    """
+    Связи и колонки модели, которые читает сериализатор.
+    Результат зависит только от класса сериализатора, поэтому кэшируется.
+    """
+    serializer = serializer_class()
+    lookups = QuerysetLookups()
+    lookups.prunable = collect_lookups(serializer, serializer.Meta.model, lookups)
+    return lookups
+
+
+class OptimizeQuerysetMixin:
+    """
+    Автоматические select_related/prefetch_related (и only() для чтения) по дереву полей
+    сериализатора текущего действия, чтобы количество запросов не зависело от количества объектов.
+    Применяется в filter_queryset, через который проходят list и get_object.
+    """
+
+    def get_optimization_serializer_class(self):
+        """Сериализатор, по которому оптимизируется queryset, или None"""
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, serializers.ModelSerializer):
+            return serializer_class
+        return None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.optimize_queryset(queryset)
+
+    def optimize_queryset(self, queryset):
+        serializer_class = self.get_optimization_serializer_class()
+        if serializer_class is None or not issubclass(queryset.model, serializer_class.Meta.model):
+            return queryset
+        return get_serializer_lookups(serializer_class).apply(queryset, prune=self.action in READ_ACTIONS)
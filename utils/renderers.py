@@ -0,0 +1,125 @@
+import codecs
+import csv
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+# Символы, которые JSONRenderer экранирует, чтобы JSON оставался подмножеством JavaScript
+UNSAFE_JS_CHARS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONEncoder(encoders.JSONEncoder):
+    """Кодировщик DRF, дополнительно выводящий файлы (ImageField) как URL"""
+
+    def default(self, obj):
+        if isinstance(obj, FieldFile):
+            return obj.url if obj else None
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson с тем же результатом, что и у стандартного.
+    Даты, Decimal, ленивые строки перевода и файлы кодируются как в FastJSONEncoder.
+    Без orjson, а также при выводе с отступами используется стандартный json.
+    """
+    encoder_class = FastJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Например, целые числа больше 64 бит
+            return super().render(data, accepted_media_type, renderer_context)
+        for char, escaped in UNSAFE_JS_CHARS:
+            if char in ret:
+                ret = ret.replace(char, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, без orjson используется стандартный json"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read() if stream is not None else b''
+            if codecs.lookup(encoding).name != 'utf-8':
+                content = content.decode(encoding).encode()
+            return orjson.loads(content)
+        except (ValueError, UnicodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON: одна строка JSON на объект, подходит для потоковой выгрузки"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.render_row(row) for row in rows)
+
+    @staticmethod
+    def render_row(row) -> bytes:
+        return FastJSONRenderer().render(row) + b'\n'
+
+
+class Echo:
+    """Файлоподобный объект, возвращающий записанную строку (для csv.writer в потоке)"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV с заголовком из ключей первого объекта"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows else []
+        return ''.join(self.stream(rows, columns)).encode(self.charset)
+
+    @staticmethod
+    def stream(rows, columns):
+        """
+        Строки CSV по одной, начиная с заголовка
+        :param rows: словари; списки значений выводятся через запятую
+        :param columns: колонки в порядке вывода
+        """
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([
+                ', '.join(str(item) for item in value) if isinstance(value, list) else value
+                for value in (row.get(column) for column in columns)
+            ])
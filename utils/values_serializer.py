@@ -0,0 +1,201 @@
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from utils.queryset import get_model_field
+
+# Поля, представление которых совпадает со значением из values()
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.SlugField, serializers.BooleanField)
+
+OWNER_COLUMN = '_owner'
+
+
+class NotCompilable(Exception):
+    """Сериализатор содержит поля, которые нельзя вывести из values()"""
+
+
+class ScalarNode:
+
+    def __init__(self, name, column, convert=None):
+        self.name = name
+        self.column = column
+        self.convert = convert
+
+    def columns(self):
+        return [self.column]
+
+    def represent(self, row, maps):
+        value = row[self.column]
+        if value is None or self.convert is None:
+            return value
+        return self.convert(value)
+
+
+class NestedNode:
+    """Вложенный сериализатор связи ForeignKey/OneToOne, колонки загружаются через join"""
+
+    def __init__(self, name, pk_column, nodes):
+        self.name = name
+        self.pk_column = pk_column
+        self.nodes = nodes
+
+    def columns(self):
+        return [self.pk_column, *(column for node in self.nodes for column in node.columns())]
+
+    def represent(self, row, maps):
+        if row[self.pk_column] is None:
+            return None
+        return {node.name: node.represent(row, maps) for node in self.nodes}
+
+
+class ManyNode:
+    """Вложенный сериализатор many=True, строки загружаются одним запросом для всех владельцев"""
+
+    def __init__(self, name, pk_column, related_model, owner_lookup, serializer):
+        self.name = name
+        self.pk_column = pk_column
+        self.related_model = related_model
+        self.owner_lookup = owner_lookup
+        self.serializer = serializer
+
+    def columns(self):
+        return [self.pk_column]
+
+    def load(self, rows) -> dict:
+        """Представления связанных объектов по первичному ключу владельца"""
+        owner_pks = {row[self.pk_column] for row in rows}
+        result = {pk: [] for pk in owner_pks}
+        if not owner_pks:
+            return result
+        related_rows = list(
+            self.related_model._default_manager
+            .filter(**{f'{self.owner_lookup}__in': owner_pks})
+            .values(*self.serializer.columns, **{OWNER_COLUMN: F(self.owner_lookup)})
+        )
+        for row, data in zip(related_rows, self.serializer.represent(related_rows)):
+            result[row[OWNER_COLUMN]].append(data)
+        return result
+
+    def represent(self, row, maps):
+        return maps[self][row[self.pk_column]]
+
+
+def get_owner_lookup(model_field) -> str:
+    """Путь от связанной модели к модели-владельцу"""
+    if model_field.many_to_many and not model_field.auto_created:
+        return model_field.related_query_name()
+    if model_field.one_to_many or model_field.many_to_many:
+        return model_field.field.name
+    raise NotCompilable(model_field.name)
+
+
+def get_converter(field, model_field):
+    if type(field) in IDENTITY_FIELDS:
+        return None
+    if isinstance(field, serializers.FileField):
+        return lambda value: field.to_representation(FieldFile(None, model_field, value))
+    return field.to_representation
+
+
+def compile_nodes(serializer, model, prefix: str = '') -> list:
+    nodes = []
+    for field_name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if source == '*' or '.' in source:
+            raise NotCompilable(field_name)
+        model_field = get_model_field(model, source)
+        if model_field is None:
+            raise NotCompilable(field_name)
+
+        column = f'{prefix}{source}'
+        pk_column = f'{prefix}{model._meta.pk.name}'
+        if isinstance(field, serializers.ListSerializer):
+            related_model = model_field.related_model
+            nested = ValuesSerializer(field.child, related_model)
+            nodes.append(ManyNode(field_name, pk_column, related_model, get_owner_lookup(model_field), nested))
+        elif isinstance(field, serializers.BaseSerializer):
+            if not (model_field.many_to_one or model_field.one_to_one):
+                raise NotCompilable(field_name)
+            related_model = model_field.related_model
+            nested_nodes = compile_nodes(field, related_model, f'{column}__')
+            if any(isinstance(node, ManyNode) for node in nested_nodes):
+                raise NotCompilable(field_name)
+            nodes.append(NestedNode(field_name, f'{column}__{related_model._meta.pk.name}', nested_nodes))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None \
+                and model_field.many_to_one:
+            nodes.append(ScalarNode(field_name, column))
+        elif model_field.is_relation:
+            raise NotCompilable(field_name)
+        else:
+            nodes.append(ScalarNode(field_name, column, get_converter(field, model_field)))
+    return nodes
+
+
+class ValuesSerializer:
+    """
+    Скомпилированное представление ModelSerializer только для чтения.
+    Данные строятся из строк values() (связи ForeignKey - через join)
+    и словарей связанных объектов many=True, загруженных одним запросом на связь,
+    без создания экземпляров моделей и обхода полей DRF для каждого объекта.
+    Результат совпадает с serializer.data.
+    """
+
+    def __init__(self, serializer, model=None):
+        self.model = model or serializer.Meta.model
+        self.nodes = compile_nodes(serializer, self.model)
+        self.columns = list(dict.fromkeys(column for node in self.nodes for column in node.columns()))
+        self.many_nodes = [node for node in self.nodes if isinstance(node, ManyNode)]
+
+    @classmethod
+    def compile(cls, serializer_class, context=None):
+        """
+        :return: ValuesSerializer или None, если сериализатор нельзя скомпилировать
+        """
+        try:
+            return cls(serializer_class(context=context or {}))
+        except NotCompilable:
+            return None
+
+    def get_rows(self, queryset, extra_columns=()):
+        """Queryset строк values() с колонками сериализатора и дополнительными колонками (например, сортировки)"""
+        columns = dict.fromkeys([*self.columns, *extra_columns])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def represent(self, rows) -> list[dict]:
+        rows = list(rows)
+        maps = {node: node.load(rows) for node in self.many_nodes}
+        return [{node.name: node.represent(row, maps) for node in self.nodes} for row in rows]
+
+
+class ValuesListMixin:
+    """Вывод list через ValuesSerializer, если сериализатор действия можно скомпилировать"""
+
+    def get_values_serializer(self):
+        if self.action != 'list':
+            return None
+        return ValuesSerializer.compile(self.get_serializer_class(), self.get_serializer_context())
+
+    def get_ordering_columns(self, queryset) -> list[str]:
+        """Колонки сортировки, нужные пагинатору для построения курсора"""
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            ordering += paginator.get_ordering(self.request, queryset, self)
+        return [field.lstrip('-') for field in ordering]
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = values_serializer.get_rows(queryset, self.get_ordering_columns(queryset))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.represent(page))
+
+        return Response(values_serializer.represent(rows))